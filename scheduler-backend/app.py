@@ -1,13 +1,27 @@
-from flask import Flask, request, jsonify, send_file, Response
+from flask import Flask, request, jsonify, send_file, url_for, Response
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 import os
+import re
 import time
 import logging
 import io
-import pandas as pd
+import stat
+import tempfile
+import hashlib
+import threading
+import uuid
+import zipfile
+import multiprocessing
+import orjson
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import xlsxwriter
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER
@@ -23,9 +37,51 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Exported schedules only cover Monday to Friday
+WEEKDAYS = ("MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY")
+WEEKDAYS_SET = frozenset(WEEKDAYS)
+
+# Cell labels for break entries by breakType; other break types are shown as "Break"
+PDF_BREAK_LABELS = {"breakfast": "🍳 Breakfast Break", "lunch": "🍽️ Lunch Break"}
+EXCEL_BREAK_LABELS = {"breakfast": "Breakfast Break", "lunch": "Lunch Break"}
+
+# PDF styles, built once at import rather than per export
+PDF_TITLE_STYLE = ParagraphStyle(
+    'Title',
+    parent=getSampleStyleSheet()['Heading1'],
+    alignment=TA_CENTER,
+    spaceAfter=0.3*inch
+)
+PDF_BASE_TABLE_STYLE_CMDS = (
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (0, -1), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+)
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson for faster request parsing and responses"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)  # Used by request.json and jsonify
 CORS(app)  # Enable CORS for all routes
 
+# Compress JSON responses; schedule payloads repeat the same keys and shrink well
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -42,8 +98,8 @@ def create_schedule():
         if not data:
             return jsonify({"status": "error", "message": "No data provided"}), 400
 
-        # Log the input data size
-        logger.info(f"Input data: {len(str(data))} bytes")
+        # Log the input data size from the request header rather than re-serializing the payload
+        logger.info("Input data: %s bytes", request.content_length or "unknown")
 
         # Generate the schedule using our algorithm
         schedule = generate_schedule(data)
@@ -107,134 +163,66 @@ def validate_constraints_endpoint():
 
 def filter_weekdays(schedule):
     """Filter schedule to only include Monday to Friday"""
-    weekdays = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY"]
-    filtered_entries = [entry for entry in schedule["entries"] if entry["day"] in weekdays]
+    filtered_entries = [entry for entry in schedule["entries"] if entry["day"] in WEEKDAYS_SET]
     return {"scheduleId": schedule["scheduleId"], "entries": filtered_entries}
 
-def create_pdf(schedule, class_filter=None, include_breaks=True):
+def create_pdf(schedule, class_filter=None):
     """Generate a PDF of the schedule"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
     elements = []
 
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'Title',
-        parent=styles['Heading1'],
-        alignment=TA_CENTER,
-        spaceAfter=0.3*inch
-    )
-
-    # Filter by class if specified
-    if class_filter:
-        filtered_entries = [entry for entry in schedule["entries"] if entry["classId"] == class_filter]
-        title = f"Class Schedule: {class_filter}"
-    else:
-        filtered_entries = schedule["entries"]
-        title = "School Master Schedule"
+    # Filter to Monday-Friday and, if specified, to a single class in one pass
+    filtered_entries = [
+        entry for entry in schedule["entries"]
+        if entry["day"] in WEEKDAYS_SET and (not class_filter or entry["classId"] == class_filter)
+    ]
+    title = f"Class Schedule: {class_filter}" if class_filter else "School Master Schedule"
 
     # Add title
-    elements.append(Paragraph(title, title_style))
+    elements.append(Paragraph(title, PDF_TITLE_STYLE))
     elements.append(Spacer(1, 0.2*inch))
 
-    # Filter to only include Monday-Friday
-    weekdays = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY"]
-    filtered_entries = [entry for entry in filtered_entries if entry["day"] in weekdays]
-
     # Group entries by time slot and day
-    time_slots = sorted(set([(entry["startTime"], entry["endTime"]) for entry in filtered_entries]))
-    days = weekdays
+    time_slots = sorted({(entry["startTime"], entry["endTime"]) for entry in filtered_entries})
 
     # Create data for the table
-    data = [["TIME"] + days]
-
-    # Find breakfast and lunch breaks
-    breakfast_slots = {}
-    lunch_slots = {}
-    if include_breaks:
-        for entry in filtered_entries:
-            if entry.get("isBreak") and entry.get("breakType") == "breakfast":
-                time_key = (entry["startTime"], entry["endTime"])
-                day_key = entry["day"]
-                if time_key not in breakfast_slots:
-                    breakfast_slots[time_key] = set()
-                breakfast_slots[time_key].add(day_key)
-            elif entry.get("isBreak") and entry.get("breakType") == "lunch":
-                time_key = (entry["startTime"], entry["endTime"])
-                day_key = entry["day"]
-                if time_key not in lunch_slots:
-                    lunch_slots[time_key] = set()
-                lunch_slots[time_key].add(day_key)
+    data = [["TIME"] + list(WEEKDAYS)]
+
+    # Index entries by (start time, day), keeping the first entry for each cell
+    entry_index = {}
+    for entry in filtered_entries:
+        entry_index.setdefault((entry["startTime"], entry["day"]), entry)
 
     # Add rows for each time slot
-    for time_slot in time_slots:
-        start_time, end_time = time_slot
+    for start_time, end_time in time_slots:
         row = [f"{start_time} - {end_time}"]
-
-        # Check if this is a break slot
-        is_breakfast = time_slot in breakfast_slots
-        is_lunch = time_slot in lunch_slots
-
-        for day in days:
-            # Find entries for this time slot and day
-            day_entries = [e for e in filtered_entries if e["startTime"] == start_time and e["day"] == day]
-
-            if day_entries:
-                entry = day_entries[0]  # Take the first entry if multiple exist
-                if entry.get("isBreak"):
-                    if entry.get("breakType") == "breakfast":
-                        cell_text = "🍳 Breakfast Break"
-                    elif entry.get("breakType") == "lunch":
-                        cell_text = "🍽️ Lunch Break"
-                    else:
-                        cell_text = "Break"
-                else:
-                    subject_id = entry["subjectId"]
-                    teacher_id = entry["teacherId"]
-                    cell_text = f"{subject_id}\n{teacher_id}"
-                row.append(cell_text)
+        for day in WEEKDAYS:
+            # Find the first entry for this time slot and day; break slots have their own entries
+            entry = entry_index.get((start_time, day))
+            if not entry:
+                row.append("")
+            elif entry.get("isBreak"):
+                row.append(PDF_BREAK_LABELS.get(entry.get("breakType"), "Break"))
             else:
-                # Check if this should be a break based on other classes
-                if is_breakfast and day in breakfast_slots.get(time_slot, set()):
-                    row.append("🍳 Breakfast Break")
-                elif is_lunch and day in lunch_slots.get(time_slot, set()):
-                    row.append("🍽️ Lunch Break")
-                else:
-                    row.append("")
-
+                row.append(f"{entry['subjectId']}\n{entry['teacherId']}")
         data.append(row)
 
     # Create the table
-    table = Table(data, colWidths=[1.2*inch] + [1.5*inch]*len(days))
+    table = LongTable(data, colWidths=[1.2*inch] + [1.5*inch]*len(WEEKDAYS), repeatRows=1)
 
     # Style the table
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (0, -1), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ])
-
-    # Add special styling for breaks
-    for i, row in enumerate(data):
-        if i == 0:  # Skip header row
-            continue
-
-        for j, cell in enumerate(row):
-            if j == 0:  # Skip time column
-                continue
+    style_cmds = list(PDF_BASE_TABLE_STYLE_CMDS)
 
+    # Add special styling for breaks, skipping the header row and time column
+    for i, row in enumerate(data[1:], start=1):
+        for j, cell in enumerate(row[1:], start=1):
             if "Breakfast Break" in cell:
-                style.add('BACKGROUND', (j, i), (j, i), colors.lightblue)
+                style_cmds.append(('BACKGROUND', (j, i), (j, i), colors.lightblue))
             elif "Lunch Break" in cell:
-                style.add('BACKGROUND', (j, i), (j, i), colors.lightyellow)
+                style_cmds.append(('BACKGROUND', (j, i), (j, i), colors.lightyellow))
 
-    table.setStyle(style)
+    table.setStyle(TableStyle(style_cmds))
     elements.append(table)
 
     # Build the PDF
@@ -242,124 +230,222 @@ def create_pdf(schedule, class_filter=None, include_breaks=True):
     buffer.seek(0)
     return buffer
 
-def create_excel(schedule, class_filter=None, include_breaks=True):
+def create_excel(schedule, class_filter=None):
     """Generate an Excel file of the schedule"""
-    # Filter by class if specified
-    if class_filter:
-        filtered_entries = [entry for entry in schedule["entries"] if entry["classId"] == class_filter]
-    else:
-        filtered_entries = schedule["entries"]
-
-    # Filter to only include Monday-Friday
-    weekdays = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY"]
-    filtered_entries = [entry for entry in filtered_entries if entry["day"] in weekdays]
+    # Filter to Monday-Friday and, if specified, to a single class in one pass
+    filtered_entries = [
+        entry for entry in schedule["entries"]
+        if entry["day"] in WEEKDAYS_SET and (not class_filter or entry["classId"] == class_filter)
+    ]
 
     # Group entries by time slot and day
-    time_slots = sorted(set([(entry["startTime"], entry["endTime"]) for entry in filtered_entries]))
-    days = weekdays
-
-    # Create DataFrame
-    data = []
-
-    # Find breakfast and lunch breaks
-    breakfast_slots = {}
-    lunch_slots = {}
-    if include_breaks:
-        for entry in filtered_entries:
-            if entry.get("isBreak") and entry.get("breakType") == "breakfast":
-                time_key = (entry["startTime"], entry["endTime"])
-                day_key = entry["day"]
-                if time_key not in breakfast_slots:
-                    breakfast_slots[time_key] = set()
-                breakfast_slots[time_key].add(day_key)
-            elif entry.get("isBreak") and entry.get("breakType") == "lunch":
-                time_key = (entry["startTime"], entry["endTime"])
-                day_key = entry["day"]
-                if time_key not in lunch_slots:
-                    lunch_slots[time_key] = set()
-                lunch_slots[time_key].add(day_key)
+    time_slots = sorted({(entry["startTime"], entry["endTime"]) for entry in filtered_entries})
 
-    # Add rows for each time slot
-    for time_slot in time_slots:
-        start_time, end_time = time_slot
-        row = {"TIME": f"{start_time} - {end_time}"}
-
-        # Check if this is a break slot
-        is_breakfast = time_slot in breakfast_slots
-        is_lunch = time_slot in lunch_slots
-
-        for day in days:
-            # Find entries for this time slot and day
-            day_entries = [e for e in filtered_entries if e["startTime"] == start_time and e["day"] == day]
-
-            if day_entries:
-                entry = day_entries[0]  # Take the first entry if multiple exist
-                if entry.get("isBreak"):
-                    if entry.get("breakType") == "breakfast":
-                        cell_text = "Breakfast Break"
-                    elif entry.get("breakType") == "lunch":
-                        cell_text = "Lunch Break"
-                    else:
-                        cell_text = "Break"
-                else:
-                    subject_id = entry["subjectId"]
-                    teacher_id = entry["teacherId"]
-                    cell_text = f"{subject_id} - {teacher_id}"
-                row[day] = cell_text
-            else:
-                # Check if this should be a break based on other classes
-                if is_breakfast and day in breakfast_slots.get(time_slot, set()):
-                    row[day] = "Breakfast Break"
-                elif is_lunch and day in lunch_slots.get(time_slot, set()):
-                    row[day] = "Lunch Break"
-                else:
-                    row[day] = ""
+    # Index entries by (start time, day), keeping the first entry for each cell
+    entry_index = {}
+    for entry in filtered_entries:
+        entry_index.setdefault((entry["startTime"], entry["day"]), entry)
 
-        data.append(row)
+    # Build the table rows
+    header = ["TIME"] + list(WEEKDAYS)
+    rows = []
+    for start_time, end_time in time_slots:
+        row = [f"{start_time} - {end_time}"]
+        for day in WEEKDAYS:
+            entry = entry_index.get((start_time, day))
+            if not entry:
+                row.append("")
+            elif entry.get("isBreak"):
+                row.append(EXCEL_BREAK_LABELS.get(entry.get("breakType"), "Break"))
+            else:
+                row.append(f"{entry['subjectId']} - {entry['teacherId']}")
+        rows.append(row)
 
-    # Create DataFrame and Excel file
-    df = pd.DataFrame(data)
+    # Create the Excel file. constant_memory flushes each row once the next one starts,
+    # so rows are written in order with column widths set up front.
     buffer = io.BytesIO()
-    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Schedule', index=False)
-
-        # Get the xlsxwriter workbook and worksheet objects
-        workbook = writer.book
-        worksheet = writer.sheets['Schedule']
-
-        # Add formats for breaks
-        breakfast_format = workbook.add_format({'bg_color': '#ADD8E6'})  # Light blue
-        lunch_format = workbook.add_format({'bg_color': '#FFFFE0'})  # Light yellow
-
-        # Apply conditional formatting
-        for col_num, col_name in enumerate(df.columns):
-            if col_name != 'TIME':
-                # Format breakfast breaks
-                worksheet.conditional_format(
-                    1, col_num + 1, len(df), col_num + 1,
-                    {'type': 'text',
-                     'criteria': 'containing',
-                     'value': 'Breakfast',
-                     'format': breakfast_format}
-                )
-
-                # Format lunch breaks
-                worksheet.conditional_format(
-                    1, col_num + 1, len(df), col_num + 1,
-                    {'type': 'text',
-                     'criteria': 'containing',
-                     'value': 'Lunch',
-                     'format': lunch_format}
-                )
-
-        # Auto-adjust column widths
-        for i, col in enumerate(df.columns):
-            column_width = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, column_width)
+    workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Schedule')
+
+    # Add formats for the header and breaks
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    breakfast_format = workbook.add_format({'bg_color': '#ADD8E6'})  # Light blue
+    lunch_format = workbook.add_format({'bg_color': '#FFFFE0'})  # Light yellow
+
+    # Auto-adjust column widths
+    for i, col in enumerate(header):
+        column_width = max([len(col)] + [len(row[i]) for row in rows]) + 2
+        worksheet.set_column(i, i, column_width)
+
+    worksheet.write_row(0, 0, header, header_format)
+
+    # Write break cells with their background format; cell contents are known up front,
+    # so there is no need for conditional formatting rules evaluated by Excel
+    for row_num, row in enumerate(rows, start=1):
+        worksheet.write(row_num, 0, row[0])
+        for col_num, cell in enumerate(row[1:], start=1):
+            if "Breakfast" in cell:
+                worksheet.write(row_num, col_num, cell, breakfast_format)
+            elif "Lunch" in cell:
+                worksheet.write(row_num, col_num, cell, lunch_format)
+            else:
+                worksheet.write(row_num, col_num, cell)
 
+    workbook.close()
     buffer.seek(0)
     return buffer
 
+# Rendered exports keyed by (kind, schedule digest, class filter), so re-exports of an
+# unchanged schedule skip rendering without keeping the schedule JSON alive as a key
+EXPORT_CACHE_SIZE = 128
+_export_cache = OrderedDict()
+_export_cache_lock = threading.Lock()
+
+def _render_cached(kind, create, schedule_json, class_filter):
+    """Render an export for a JSON-serialized schedule, serving repeats from the cache"""
+    key = (kind, hashlib.sha256(schedule_json).hexdigest(), class_filter)
+    with _export_cache_lock:
+        file_bytes = _export_cache.get(key)
+        if file_bytes is not None:
+            _export_cache.move_to_end(key)
+            return file_bytes
+
+    file_bytes = create(orjson.loads(schedule_json), class_filter).getvalue()
+    with _export_cache_lock:
+        _export_cache[key] = file_bytes
+        while len(_export_cache) > EXPORT_CACHE_SIZE:
+            _export_cache.popitem(last=False)
+    return file_bytes
+
+def _render_pdf_bytes(schedule_json, class_filter):
+    """Render a PDF for a JSON-serialized schedule, caching the result"""
+    return _render_cached('pdf', create_pdf, schedule_json, class_filter)
+
+def _render_excel_bytes(schedule_json, class_filter):
+    """Render an Excel file for a JSON-serialized schedule, caching the result"""
+    return _render_cached('excel', create_excel, schedule_json, class_filter)
+
+def _invalid_class_filter(class_filter):
+    """Return a 400 response if the optional classId is not a string, else None"""
+    if class_filter is not None and not isinstance(class_filter, str):
+        return jsonify({"status": "error", "message": "classId must be a string"}), 400
+    return None
+
+# Background export jobs, used when an export request sets "async": true. Job status and
+# results are files in a shared directory, so a poll can be answered by any Gunicorn worker
+# on the host, not only the one that accepted the job. The directory must belong to the app's
+# user and be closed to others, since it holds rendered timetables. A job still pending after
+# the render timeout is reported as failed (e.g. its worker was restarted mid-render).
+EXPORT_JOB_TTL_SECONDS = 600
+EXPORT_JOB_RENDER_TIMEOUT_SECONDS = 120
+EXPORT_JOB_DIR = os.environ.get('EXPORT_JOB_DIR') or os.path.join(tempfile.gettempdir(), 'scheduler-export-jobs')
+_export_executor = ThreadPoolExecutor(max_workers=4)
+
+def _export_job_path(job_id, suffix):
+    """Path of an export job's status ('json') or result ('bin') file"""
+    return os.path.join(EXPORT_JOB_DIR, f"{job_id}.{suffix}")
+
+def _check_export_job_dir():
+    """Create the export job directory, refusing one that other users could tamper with"""
+    os.makedirs(EXPORT_JOB_DIR, mode=0o700, exist_ok=True)
+    st = os.lstat(EXPORT_JOB_DIR)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"Export job directory {EXPORT_JOB_DIR} must be a directory owned by "
+                           f"this user and closed to other users")
+
+def _write_file_atomic(path, data):
+    """Write bytes to a private file at path so that readers never see a partial file"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _read_export_job(job_id):
+    """Load an export job's status, or None if it does not exist"""
+    try:
+        uuid.UUID(job_id)
+        with open(_export_job_path(job_id, 'json'), 'rb') as f:
+            return orjson.loads(f.read())
+    except (ValueError, OSError):
+        return None
+
+def _sweep_export_jobs():
+    """Delete export job files that have outlived their TTL"""
+    cutoff = time.time() - EXPORT_JOB_TTL_SECONDS
+    try:
+        names = os.listdir(EXPORT_JOB_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(EXPORT_JOB_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def _run_export_job(job_id, job, render, schedule_json, class_filter):
+    """Render an export and record its result or error for polling"""
+    # Restart the render timeout now that the job has left the queue
+    job["started"] = time.time()
+    _write_file_atomic(_export_job_path(job_id, 'json'), orjson.dumps(job))
+    try:
+        _write_file_atomic(_export_job_path(job_id, 'bin'), render(schedule_json, class_filter))
+        job["status"] = "done"
+    except Exception as e:
+        logger.error(f"Error in export job {job_id}: {str(e)}")
+        job["status"] = "error"
+        job["message"] = str(e)
+    _write_file_atomic(_export_job_path(job_id, 'json'), orjson.dumps(job))
+
+def _submit_export_job(kind, render, schedule_json, class_filter, mimetype, download_name):
+    """Queue an export render on the thread pool and return its job id"""
+    _check_export_job_dir()
+    _sweep_export_jobs()
+    job_id = str(uuid.uuid4())
+    job = {
+        "kind": kind,
+        "status": "pending",
+        "started": time.time(),
+        "mimetype": mimetype,
+        "download_name": download_name
+    }
+    _write_file_atomic(_export_job_path(job_id, 'json'), orjson.dumps(job))
+    _export_executor.submit(_run_export_job, job_id, job, render, schedule_json, class_filter)
+    return job_id
+
+def _export_job_response(kind, job_id):
+    """Return the file for a finished export job, or its pending/error status"""
+    try:
+        _check_export_job_dir()
+    except (OSError, RuntimeError) as e:
+        logger.error(f"Error reading export job {job_id}: {str(e)}")
+        return jsonify({"status": "error", "message": "Export job storage unavailable"}), 500
+    _sweep_export_jobs()
+    job = _read_export_job(job_id)
+    if job is None or job["kind"] != kind:
+        return jsonify({"status": "error", "message": f"Unknown export job: {job_id}"}), 404
+
+    if job["status"] == "pending":
+        if time.time() - job.get("started", 0) > EXPORT_JOB_RENDER_TIMEOUT_SECONDS:
+            return jsonify({"status": "error", "message": "Export job did not finish"}), 500
+        return jsonify({"status": "pending", "jobId": job_id}), 202
+    if job["status"] == "error":
+        return jsonify({"status": "error", "message": job.get("message", "Export failed")}), 500
+
+    try:
+        with open(_export_job_path(job_id, 'bin'), 'rb') as f:
+            file_bytes = f.read()
+    except OSError:
+        return jsonify({"status": "error", "message": f"Unknown export job: {job_id}"}), 404
+
+    return send_file(
+        io.BytesIO(file_bytes),
+        mimetype=job["mimetype"],
+        as_attachment=True,
+        download_name=job["download_name"]
+    )
+
 @app.route('/api/export/pdf', methods=['POST'])
 def export_pdf():
     """Export schedule as PDF"""
@@ -370,23 +456,142 @@ def export_pdf():
 
         schedule = data['schedule']
         class_filter = data.get('classId')  # Optional class filter
-        include_breaks = data.get('includeBreaks', True)
-
-        # Generate PDF
-        pdf_buffer = create_pdf(schedule, class_filter, include_breaks)
-
-        # Return the PDF file
+        invalid = _invalid_class_filter(class_filter)
+        if invalid:
+            return invalid
+
+        schedule_json = orjson.dumps(schedule, option=orjson.OPT_SORT_KEYS)
+        download_name = f"schedule-{schedule['scheduleId']}.pdf"
+
+        # Optionally generate in the background and let the client poll for the file
+        if data.get('async'):
+            job_id = _submit_export_job('pdf', _render_pdf_bytes, schedule_json, class_filter,
+                                        'application/pdf', download_name)
+            status_url = url_for('export_pdf_job', job_id=job_id)
+            return jsonify({"status": "accepted", "jobId": job_id, "statusUrl": status_url}), 202
+
+        # Generate PDF (re-exports of an unchanged schedule are served from the cache)
+        pdf_buffer = io.BytesIO(_render_pdf_bytes(schedule_json, class_filter))
+
+        # Return the PDF file. ReportLab writes the whole document in a single write when
+        # build() finishes, so there is nothing to stream before that; send_file already
+        # sends the buffer to the client in chunks.
         return send_file(
             pdf_buffer,
             mimetype='application/pdf',
             as_attachment=True,
-            download_name=f"schedule-{schedule['scheduleId']}.pdf"
+            download_name=download_name
         )
 
     except Exception as e:
         logger.error(f"Error exporting PDF: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# Process pool for batch PDF exports; ReportLab rendering is CPU-bound and holds the GIL.
+# Created on first use, with workers started from a forkserver rather than forked from this
+# multi-threaded process. Each worker process has its own memory, so batch renders neither
+# use nor fill the export cache. SCHEDULER_EXPORT_WORKERS caps the workers per app process;
+# 0 uses one per CPU core, up to 4.
+try:
+    PDF_EXPORT_WORKERS = max(0, int(os.environ.get('SCHEDULER_EXPORT_WORKERS', 0)))
+except ValueError:
+    logger.warning("Ignoring invalid SCHEDULER_EXPORT_WORKERS=%r; using the default",
+                   os.environ['SCHEDULER_EXPORT_WORKERS'])
+    PDF_EXPORT_WORKERS = 0
+_pdf_process_pool = None
+_pdf_process_pool_lock = threading.Lock()
+
+def _get_pdf_process_pool():
+    """Return the shared process pool for batch PDF exports"""
+    global _pdf_process_pool
+    with _pdf_process_pool_lock:
+        if _pdf_process_pool is None:
+            _pdf_process_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXPORT_WORKERS or min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context('forkserver')
+            )
+        return _pdf_process_pool
+
+def _create_pdf_bytes(schedule_json, class_filter):
+    """Render a PDF for a JSON-serialized schedule in a batch worker process"""
+    return create_pdf(orjson.loads(schedule_json), class_filter).getvalue()
+
+def _render_pdf_batch(schedule_json, class_ids):
+    """Render one PDF per class on the process pool, in class_ids order"""
+    global _pdf_process_pool
+    pool = _get_pdf_process_pool()
+    try:
+        futures = [pool.submit(_create_pdf_bytes, schedule_json, class_id) for class_id in class_ids]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); drop the pool so the next call starts a new one
+        with _pdf_process_pool_lock:
+            if _pdf_process_pool is pool:
+                _pdf_process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+def _safe_filename_part(value):
+    """Reduce a value to characters that are safe in a file or ZIP member name"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(value)).strip('.') or '_'
+
+@app.route('/api/export/pdf/batch', methods=['POST'])
+def export_pdf_batch():
+    """Export one PDF per class as a ZIP archive"""
+    try:
+        data = request.json
+        if not data or 'schedule' not in data:
+            return jsonify({"status": "error", "message": "No schedule data provided"}), 400
+
+        class_ids = data.get('classIds')
+        if not class_ids:
+            return jsonify({"status": "error", "message": "No class IDs provided"}), 400
+        if (not isinstance(class_ids, list) or not all(isinstance(class_id, str) and class_id for class_id in class_ids)
+                or len(set(class_ids)) != len(class_ids)):
+            return jsonify({"status": "error", "message": "classIds must be a list of unique, non-empty strings"}), 400
+
+        schedule = data['schedule']
+        schedule_json = orjson.dumps(schedule, option=orjson.OPT_SORT_KEYS)
+
+        # ZIP member names come from the ids, so they must be plain names and stay distinct
+        schedule_part = _safe_filename_part(schedule['scheduleId'])
+        member_names = [f"schedule-{schedule_part}-{_safe_filename_part(class_id)}.pdf" for class_id in class_ids]
+        if len(set(member_names)) != len(member_names):
+            return jsonify({"status": "error", "message": "classIds map to duplicate file names"}), 400
+
+        # Render the class PDFs in parallel, retrying once on a fresh pool if a worker died
+        try:
+            pdfs = _render_pdf_batch(schedule_json, class_ids)
+        except BrokenProcessPool:
+            try:
+                pdfs = _render_pdf_batch(schedule_json, class_ids)
+            except BrokenProcessPool:
+                logger.error("PDF batch export failed: renderer processes keep dying")
+                return jsonify({"status": "error", "message": "PDF renderer unavailable, try again later"}), 503
+
+        # Collect them into a ZIP in request order
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for member_name, pdf in zip(member_names, pdfs):
+                archive.writestr(member_name, pdf)
+        zip_buffer.seek(0)
+
+        return send_file(
+            zip_buffer,
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=f"schedule-{schedule_part}-classes.zip"
+        )
+
+    except Exception as e:
+        logger.error(f"Error exporting PDF batch: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/export/pdf/<job_id>', methods=['GET'])
+def export_pdf_job(job_id):
+    """Fetch the result of a background PDF export"""
+    return _export_job_response('pdf', job_id)
+
 @app.route('/api/export/excel', methods=['POST'])
 def export_excel():
     """Export schedule as Excel"""
@@ -397,23 +602,41 @@ def export_excel():
 
         schedule = data['schedule']
         class_filter = data.get('classId')  # Optional class filter
-        include_breaks = data.get('includeBreaks', True)
+        invalid = _invalid_class_filter(class_filter)
+        if invalid:
+            return invalid
+
+        schedule_json = orjson.dumps(schedule, option=orjson.OPT_SORT_KEYS)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        download_name = f"schedule-{schedule['scheduleId']}.xlsx"
 
-        # Generate Excel
-        excel_buffer = create_excel(schedule, class_filter, include_breaks)
+        # Optionally generate in the background and let the client poll for the file
+        if data.get('async'):
+            job_id = _submit_export_job('excel', _render_excel_bytes, schedule_json, class_filter,
+                                        mimetype, download_name)
+            status_url = url_for('export_excel_job', job_id=job_id)
+            return jsonify({"status": "accepted", "jobId": job_id, "statusUrl": status_url}), 202
+
+        # Generate Excel (re-exports of an unchanged schedule are served from the cache)
+        excel_buffer = io.BytesIO(_render_excel_bytes(schedule_json, class_filter))
 
         # Return the Excel file
         return send_file(
             excel_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            mimetype=mimetype,
             as_attachment=True,
-            download_name=f"schedule-{schedule['scheduleId']}.xlsx"
+            download_name=download_name
         )
 
     except Exception as e:
         logger.error(f"Error exporting Excel: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/export/excel/<job_id>', methods=['GET'])
+def export_excel_job(job_id):
+    """Fetch the result of a background Excel export"""
+    return _export_job_response('excel', job_id)
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
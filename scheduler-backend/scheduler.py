@@ -8,15 +8,138 @@ enforces that no lesson overlaps with these break intervals.
 
 from ortools.sat.python import cp_model
 import numpy as np
+import os
+import random
+import re
 import uuid
+import hashlib
+import json
 import logging
+import threading
 import traceback
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Optional, Set, Tuple, Any
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Built models kept per process, keyed by a hash of the scheduling input, so re-solving the same
+# input skips model construction. Each entry holds the model and its assignment variable indices.
+MODEL_CACHE_SIZE: int = 8
+_model_cache: "OrderedDict[str, Tuple[cp_model.CpModel, Dict[int, int]]]" = OrderedDict()
+_model_cache_lock = threading.Lock()
+
+# validate_constraints results for recently seen inputs; the UI re-validates on every edit
+VALIDATION_CACHE_SIZE: int = 32
+_validation_cache: "OrderedDict[str, Tuple[bool, Tuple[str, ...]]]" = OrderedDict()
+_validation_cache_lock = threading.Lock()
+
+# CP-SAT search workers; 0 uses one per CPU core. Lower it when several solves share a host.
+try:
+    SOLVER_WORKERS: int = max(0, int(os.environ.get('SCHEDULER_SOLVER_WORKERS', 0)))
+except ValueError:
+    logger.warning("Ignoring invalid SCHEDULER_SOLVER_WORKERS=%r; using one worker per CPU core",
+                   os.environ['SCHEDULER_SOLVER_WORKERS'])
+    SOLVER_WORKERS = 0
+
+# Clock times in the input, e.g. "08:00"
+HHMM_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+# Bit widths of the fields packed into an assignment key, in (class, subject, teacher, room, day, slot) order
+ASSIGNMENT_KEY_BITS: Tuple[int, ...] = (12, 12, 12, 12, 8, 8)
+
+# Shift and mask of each field within a key, derived from ASSIGNMENT_KEY_BITS
+_C_SHIFT, _S_SHIFT, _T_SHIFT, _R_SHIFT, _D_SHIFT, _TS_SHIFT = (
+    sum(ASSIGNMENT_KEY_BITS[i + 1:]) for i in range(len(ASSIGNMENT_KEY_BITS))
+)
+_C_MASK, _S_MASK, _T_MASK, _R_MASK, _D_MASK, _TS_MASK = ((1 << bits) - 1 for bits in ASSIGNMENT_KEY_BITS)
+
+
+@lru_cache(maxsize=1024)
+def time_to_minutes(time_str: str) -> int:
+    """
+    Convert an 'HH:MM' time string to minutes since midnight.
+
+    Args:
+        time_str (str): Time of day in 'HH:MM' format.
+
+    Returns:
+        int: Minutes since midnight.
+    """
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+
+def slot_overlap_mask(slot_starts: np.ndarray, slot_ends: np.ndarray, start_minutes: int, end_minutes: int) -> np.ndarray:
+    """
+    Flag the time slots that overlap an interval.
+
+    Args:
+        slot_starts (np.ndarray): Slot start times in minutes since midnight.
+        slot_ends (np.ndarray): Slot end times in minutes since midnight.
+        start_minutes (int): Interval start in minutes since midnight.
+        end_minutes (int): Interval end in minutes since midnight.
+
+    Returns:
+        np.ndarray: Boolean mask with one entry per time slot.
+    """
+    return (slot_starts < end_minutes) & (slot_ends > start_minutes)
+
+
+@lru_cache(maxsize=128)
+def generate_time_slots(start_time: str, end_time: str, lesson_duration: int, break_duration: int,
+                        has_breakfast_break: bool, breakfast_break_start: str, breakfast_break_duration: int,
+                        lunch_break_start: str, lunch_break_duration: int) -> Tuple[Tuple[str, str], ...]:
+    """
+    Generate the lesson time slots for a school day, skipping the breakfast and lunch breaks.
+    Cached, since the same school settings are scheduled repeatedly.
+
+    Returns:
+        Tuple[Tuple[str, str], ...]: Tuples of (start_time, end_time)
+    """
+    def minutes_to_time(minutes: int) -> str:
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    start_minutes: int = time_to_minutes(start_time)
+    end_minutes: int = time_to_minutes(end_time)
+
+    # Use breakfast break if enabled.
+    if has_breakfast_break:
+        breakfast_start_minutes: int = time_to_minutes(breakfast_break_start)
+        breakfast_end_minutes: int = breakfast_start_minutes + breakfast_break_duration
+    else:
+        breakfast_start_minutes, breakfast_end_minutes = -1, -1
+
+    lunch_start_minutes: int = time_to_minutes(lunch_break_start)
+    lunch_end_minutes: int = lunch_start_minutes + lunch_break_duration
+
+    time_slots: List[Tuple[str, str]] = []
+    current_minutes: int = start_minutes
+
+    while current_minutes + lesson_duration <= end_minutes:
+        # Check for breakfast break overlap
+        if has_breakfast_break:
+            if current_minutes < breakfast_end_minutes and current_minutes + lesson_duration > breakfast_start_minutes:
+                current_minutes = breakfast_end_minutes
+                continue
+
+        # Check for lunch break overlap
+        if current_minutes < lunch_end_minutes and current_minutes + lesson_duration > lunch_start_minutes:
+            current_minutes = lunch_end_minutes
+            continue
+
+        # If we get here, the slot doesn't overlap with any breaks
+        lesson_start: str = minutes_to_time(current_minutes)
+        lesson_end: str = minutes_to_time(current_minutes + lesson_duration)
+        time_slots.append((lesson_start, lesson_end))
+
+        # Move to next potential slot
+        current_minutes += lesson_duration + break_duration
+
+    return tuple(time_slots)
+
 
 class TimetableScheduler:
     """
@@ -35,6 +158,8 @@ class TimetableScheduler:
         self.classes: List[Dict[str, Any]] = data.get('classes', [])
         self.subjects: List[Dict[str, Any]] = data.get('subjects', [])
         self.rooms: List[Dict[str, Any]] = data.get('rooms', [])
+        # Optional earlier schedule for the same school, used to warm-start the solver
+        self.previous_schedule: Dict[str, Any] = data.get('previous_schedule') or {}
 
         # Log the school settings
         logger.info(f"School settings: {self.school_settings}")
@@ -60,6 +185,27 @@ class TimetableScheduler:
 
         self.time_slots: List[Tuple[str, str]] = self._generate_time_slots()
 
+        for label, count, bits in zip(("classes", "subjects", "teachers", "rooms", "days", "time slots"),
+                                      (len(self.classes), len(self.subjects), len(self.teachers), len(self.rooms),
+                                       len(self.days), len(self.time_slots)),
+                                      ASSIGNMENT_KEY_BITS):
+            if count >= 1 << bits:
+                raise ValueError(f"Too many {label} to schedule: {count} (limit {(1 << bits) - 1})")
+        self.time_slots_minutes: List[Tuple[int, int]] = [
+            (time_to_minutes(slot_start), time_to_minutes(slot_end)) for slot_start, slot_end in self.time_slots
+        ]
+        self.slot_start_minutes: np.ndarray = np.array([start for start, _ in self.time_slots_minutes], dtype=np.int32)
+        self.slot_end_minutes: np.ndarray = np.array([end for _, end in self.time_slots_minutes], dtype=np.int32)
+
+        # Break intervals as (start, end) minutes; breakfast is None when disabled
+        breakfast_start: int = time_to_minutes(self.school_settings['breakfastBreakStartTime'])
+        lunch_start: int = time_to_minutes(self.school_settings['lunchBreakStartTime'])
+        self.breakfast_break_minutes: Any = (
+            (breakfast_start, breakfast_start + self.school_settings['breakfastBreakDuration'])
+            if self.school_settings['hasBreakfastBreak'] else None
+        )
+        self.lunch_break_minutes: Tuple[int, int] = (lunch_start, lunch_start + self.school_settings['lunchBreakDuration'])
+
         # Create indices for lookup
         self.teacher_indices: Dict[str, int] = {teacher['id']: i for i, teacher in enumerate(self.teachers)}
         self.class_indices: Dict[str, int] = {cls['id']: i for i, cls in enumerate(self.classes)}
@@ -68,17 +214,39 @@ class TimetableScheduler:
         self.day_indices: Dict[str, int] = {day: i for i, day in enumerate(self.days)}
         self.time_slot_indices: Dict[Tuple[str, str], int] = {(slot[0], slot[1]): i for i, slot in enumerate(self.time_slots)}
 
+        # Available (day, slot) pairs per teacher; None when the teacher has no availability schedule
+        self.teacher_available_slots: List[Optional[Set[Tuple[int, int]]]] = [
+            self._get_teacher_available_slots(teacher) for teacher in self.teachers
+        ]
+
+        # Qualified teacher indices per subject id, listing each teacher once even if a subject repeats
+        teachers_by_subject: Dict[str, List[int]] = {s_id: [] for s_id in self.subject_indices}
+        for t, teacher in enumerate(self.teachers):
+            for s_id in dict.fromkeys(teacher.get('subjects', [])):
+                teachers_by_subject.setdefault(s_id, []).append(t)
+        self.teachers_by_subject: Dict[str, Tuple[int, ...]] = {s_id: tuple(ts) for s_id, ts in teachers_by_subject.items()}
+
         # Reverse mappings for extraction
         self.teacher_ids: Dict[int, str] = {i: teacher['id'] for i, teacher in enumerate(self.teachers)}
         self.class_ids: Dict[int, str] = {i: cls['id'] for i, cls in enumerate(self.classes)}
         self.subject_ids: Dict[int, str] = {i: subject['id'] for i, subject in enumerate(self.subjects)}
         self.room_ids: Dict[int, str] = {i: room['id'] for i, room in enumerate(self.rooms)}
+        self.subject_by_id: Dict[str, Dict[str, Any]] = {subject['id']: subject for subject in self.subjects}
+        self.class_by_id: Dict[str, Dict[str, Any]] = {cls['id']: cls for cls in self.classes}
+
+        # (class, day, time slot) cells blocked by breaks or free periods; no variables are created there
+        self.blocked_slot_mask: np.ndarray = self._compute_blocked_slot_mask()
 
         self.model: cp_model.CpModel = cp_model.CpModel()
-        self.assignment_vars: Dict[Tuple[int, int, int, int, int, int], cp_model.IntVar] = {}
+        # Keyed by _pack(c, s, t, r, d, ts)
+        self.assignment_vars: Dict[int, cp_model.IntVar] = {}
         self.solver: cp_model.CpSolver = cp_model.CpSolver()
         self.status: Any = None
 
+        # Readable variable names cost memory on large models, so they are only set when
+        # requested or when debug logging is on
+        self._debug_names: bool = bool(self.school_settings.get('debugVarNames', logger.isEnabledFor(logging.DEBUG)))
+
     def _generate_time_slots(self) -> List[Tuple[str, str]]:
         """
         Generate time slots based on school settings.
@@ -88,98 +256,149 @@ class TimetableScheduler:
         """
         try:
             # Retrieve all time settings from user input. No fallback defaults except for error handling.
-            start_time: str = self.school_settings['startTime']
-            end_time: str = self.school_settings['endTime']
-            lesson_duration: int = self.school_settings['lessonDuration']
-            break_duration: int = self.school_settings['breakDuration']
-            has_breakfast_break: bool = self.school_settings['hasBreakfastBreak']
-            breakfast_break_start: str = self.school_settings['breakfastBreakStartTime']
-            breakfast_break_duration: int = self.school_settings['breakfastBreakDuration']
-            lunch_break_start: str = self.school_settings['lunchBreakStartTime']
-            lunch_break_duration: int = self.school_settings['lunchBreakDuration']
-
-            def time_to_minutes(time_str: str) -> int:
-                hours, minutes = map(int, time_str.split(':'))
-                return hours * 60 + minutes
-
-            def minutes_to_time(minutes: int) -> str:
-                return f"{minutes // 60:02d}:{minutes % 60:02d}"
-
-            start_minutes: int = time_to_minutes(start_time)
-            end_minutes: int = time_to_minutes(end_time)
-
-            # Use breakfast break if enabled.
-            if has_breakfast_break:
-                breakfast_start_minutes: int = time_to_minutes(breakfast_break_start)
-                breakfast_end_minutes: int = breakfast_start_minutes + breakfast_break_duration
-            else:
-                breakfast_start_minutes, breakfast_end_minutes = -1, -1
+            return list(generate_time_slots(
+                self.school_settings['startTime'],
+                self.school_settings['endTime'],
+                self.school_settings['lessonDuration'],
+                self.school_settings['breakDuration'],
+                self.school_settings['hasBreakfastBreak'],
+                self.school_settings['breakfastBreakStartTime'],
+                self.school_settings['breakfastBreakDuration'],
+                self.school_settings['lunchBreakStartTime'],
+                self.school_settings['lunchBreakDuration'],
+            ))
+        except Exception as e:
+            logger.error(f"Error generating time slots: {e}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            # Fallback default slots in case of error
+            return [("08:00", "09:00"), ("09:15", "10:15"), ("10:30", "11:30"),
+                    ("11:45", "12:45"), ("13:30", "14:30"), ("14:45", "15:45")]
 
-            lunch_start_minutes: int = time_to_minutes(lunch_break_start)
-            lunch_end_minutes: int = lunch_start_minutes + lunch_break_duration
+    @staticmethod
+    def _pack(c: int, s: int, t: int, r: int, d: int, ts: int) -> int:
+        """
+        Pack an assignment's indices into a single integer key.
 
-            time_slots: List[Tuple[str, str]] = []
-            current_minutes: int = start_minutes
+        Returns:
+            int: Key laid out as in ASSIGNMENT_KEY_BITS.
+        """
+        return (c << _C_SHIFT | s << _S_SHIFT | t << _T_SHIFT | r << _R_SHIFT | d << _D_SHIFT
+                | ts << _TS_SHIFT)
 
-            while current_minutes + lesson_duration <= end_minutes:
-                # Check for breakfast break overlap
-                if has_breakfast_break:
-                    if current_minutes < breakfast_end_minutes and current_minutes + lesson_duration > breakfast_start_minutes:
-                        current_minutes = breakfast_end_minutes
-                        continue
+    @staticmethod
+    def _unpack(key: int) -> Tuple[int, int, int, int, int, int]:
+        """
+        Unpack an assignment key into its (class, subject, teacher, room, day, slot) indices.
 
-                # Check for lunch break overlap
-                if current_minutes < lunch_end_minutes and current_minutes + lesson_duration > lunch_start_minutes:
-                    current_minutes = lunch_end_minutes
-                    continue
+        Returns:
+            Tuple[int, int, int, int, int, int]: The unpacked indices.
+        """
+        return ((key >> _C_SHIFT) & _C_MASK, (key >> _S_SHIFT) & _S_MASK, (key >> _T_SHIFT) & _T_MASK,
+                (key >> _R_SHIFT) & _R_MASK, (key >> _D_SHIFT) & _D_MASK, (key >> _TS_SHIFT) & _TS_MASK)
 
-                # If we get here, the slot doesn't overlap with any breaks
-                lesson_start: str = minutes_to_time(current_minutes)
-                lesson_end: str = minutes_to_time(current_minutes + lesson_duration)
-                time_slots.append((lesson_start, lesson_end))
+    def _get_teacher_available_slots(self, teacher: Dict[str, Any]) -> Optional[Set[Tuple[int, int]]]:
+        """
+        Resolve a teacher's availability schedule to (day index, time slot index) pairs.
 
-                # Move to next potential slot
-                current_minutes += lesson_duration + break_duration
+        Args:
+            teacher (Dict[str, Any]): Teacher data with an optional 'availability' list.
 
-            return time_slots
-        except Exception as e:
-            logger.error(f"Error generating time slots: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            # Fallback default slots in case of error
-            return [("08:00", "09:00"), ("09:15", "10:15"), ("10:30", "11:30"),
-                    ("11:45", "12:45"), ("13:30", "14:30"), ("14:45", "15:45")]
+        Returns:
+            Optional[Set[Tuple[int, int]]]: Available pairs, or None if the teacher is always available.
+        """
+        availability: List[Dict[str, Any]] = teacher.get('availability', [])
+        if not availability:
+            return None
+        available_slots: Set[Tuple[int, int]] = set()
+        for avail in availability:
+            day: str = avail.get('day')
+            if day not in self.day_indices:
+                continue
+            day_idx: int = self.day_indices[day]
+            time_slots_list: List[Dict[str, str]] = avail.get('timeSlots', [])
+            for slot in time_slots_list:
+                start_time: str = slot.get('startTime')
+                end_time: str = slot.get('endTime')
+                if (start_time, end_time) in self.time_slot_indices:
+                    available_slots.add((day_idx, self.time_slot_indices[(start_time, end_time)]))
+        return available_slots
+
+    def _new_bool_var(self, name_format: str, *args: Any) -> cp_model.IntVar:
+        """
+        Create a Boolean variable, named only when debugVarNames is enabled.
+
+        Args:
+            name_format (str): str.format pattern for the debug name.
+            *args (Any): Values substituted into the pattern.
+
+        Returns:
+            cp_model.IntVar: The new Boolean variable.
+        """
+        return self.model.NewBoolVar(name_format.format(*args) if self._debug_names else "")
 
     def _create_variables(self) -> None:
         """
         Create decision variables for class subject assignments.
+
+        Variables are only created for qualified teachers in slots they are available for, and
+        for time slots that are not blocked by a break or by a free period for the class, so
+        those slots need no constraints of their own.
         """
         logger.info("Creating decision variables...")
+        rooms: range = range(len(self.rooms)) if self.use_room_constraints else range(1)
+
         for c in range(len(self.classes)):
             class_info = self.classes[c]
+            class_slots: List[Tuple[int, int]] = [(d, ts) for d, ts in np.argwhere(~self.blocked_slot_mask[c]).tolist()]
             required_subjects: List[str] = class_info.get('requiredSubjects', [])
             for s_id in required_subjects:
                 if s_id not in self.subject_indices:
                     logger.warning(f"Subject id {s_id} not defined.")
                     continue
                 s: int = self.subject_indices[s_id]
-                valid_teachers: List[int] = [t for t, teacher in enumerate(self.teachers) if s_id in teacher.get('subjects', [])]
+                valid_teachers: Tuple[int, ...] = self.teachers_by_subject.get(s_id, ())
                 if not valid_teachers:
                     logger.warning(f"No teachers available for subject {s_id} in class {class_info.get('name')}")
                     continue
 
-                if not self.use_room_constraints:
-                    for d in range(len(self.days)):
-                        for ts in range(len(self.time_slots)):
-                            for t in valid_teachers:
-                                var_name: str = f"c{c}_s{s}_t{t}_r0_d{d}_ts{ts}"
-                                self.assignment_vars[(c, s, t, 0, d, ts)] = self.model.NewBoolVar(var_name)
-                else:
-                    for r in range(len(self.rooms)):
-                        for d in range(len(self.days)):
-                            for ts in range(len(self.time_slots)):
-                                for t in valid_teachers:
-                                    var_name: str = f"c{c}_s{s}_t{t}_r{r}_d{d}_ts{ts}"
-                                    self.assignment_vars[(c, s, t, r, d, ts)] = self.model.NewBoolVar(var_name)
+                for r in rooms:
+                    for d, ts in class_slots:
+                        for t in valid_teachers:
+                            available_slots = self.teacher_available_slots[t]
+                            if available_slots is not None and (d, ts) not in available_slots:
+                                continue
+                            self.assignment_vars[self._pack(c, s, t, r, d, ts)] = self._new_bool_var("c{}_s{}_t{}_r{}_d{}_ts{}", c, s, t, r, d, ts)
+
+        self._build_variable_indexes()
+
+    def _build_variable_indexes(self) -> None:
+        """
+        Group the assignment variables by the axes each constraint sums over, in a single pass,
+        so constraint methods only visit variables that exist.
+        """
+        self.vars_by_t: Dict[int, List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_td: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_tdts: Dict[Tuple[int, int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_cd: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_cdts: Dict[Tuple[int, int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_rdts: Dict[Tuple[int, int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_cs: Dict[Tuple[int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_cst: Dict[Tuple[int, int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_csd: Dict[Tuple[int, int, int], List[cp_model.IntVar]] = defaultdict(list)
+        self.vars_by_csdts: Dict[Tuple[int, int, int, int], List[cp_model.IntVar]] = defaultdict(list)
+
+        for key, var in self.assignment_vars.items():
+            c, s, t, r, d, ts = self._unpack(key)
+            self.vars_by_t[t].append(var)
+            self.vars_by_td[(t, d)].append(var)
+            self.vars_by_tdts[(t, d, ts)].append(var)
+            self.vars_by_cd[(c, d)].append(var)
+            self.vars_by_cdts[(c, d, ts)].append(var)
+            self.vars_by_rdts[(r, d, ts)].append(var)
+            self.vars_by_cs[(c, s)].append(var)
+            self.vars_by_cst[(c, s, t)].append(var)
+            self.vars_by_csd[(c, s, d)].append(var)
+            self.vars_by_csdts[(c, s, d, ts)].append(var)
 
     def _add_all_constraints(self) -> None:
         """
@@ -188,16 +407,14 @@ class TimetableScheduler:
         logger.info("Adding constraints...")
         self._add_subject_hours_constraint()
         self._add_teacher_consistency_constraint()  # Add new constraint for teacher consistency
+        self._add_symmetry_breaking_constraints()
         self._add_teacher_availability_constraints()
         self._add_class_constraints()
         if self.use_room_constraints:
             self._add_room_constraints()
-        self._add_break_constraints()
         self._add_daily_lessons_constraints()
-        self._add_free_period_constraints()
         self._add_balanced_distribution_constraint()
         self._add_heavy_subjects_morning_preference()
-        self._add_teacher_availability_schedule_constraint()
         self._add_no_repeat_subject_constraint()  # Add constraint to prevent same subject back-to-back or multiple times per day
 
     def _add_teacher_consistency_constraint(self) -> None:
@@ -209,6 +426,8 @@ class TimetableScheduler:
 
         # Store teacher assignments for debugging
         self.teacher_assignments = {}
+        # Teacher choice variables per (class, subject), used for symmetry breaking
+        self.teacher_choice_vars: Dict[Tuple[int, int], Dict[int, cp_model.IntVar]] = {}
 
         for c in range(len(self.classes)):
             class_info = self.classes[c]
@@ -222,66 +441,34 @@ class TimetableScheduler:
                 s = self.subject_indices[s_id]
 
                 # For each class-subject pair, create a variable for each possible teacher
-                valid_teachers = [t for t, teacher in enumerate(self.teachers) if s_id in teacher.get('subjects', [])]
+                valid_teachers = self.teachers_by_subject.get(s_id, ())
                 if not valid_teachers:
                     logger.warning(f"No valid teachers for subject {s_id} in class {class_id}")
                     continue
 
                 teacher_vars = {}
                 for t in valid_teachers:
-                    var_name = f"teacher_assigned_c{c}_s{s}_t{t}"
-                    teacher_vars[t] = self.model.NewBoolVar(var_name)
+                    teacher_vars[t] = self._new_bool_var("teacher_assigned_c{}_s{}_t{}", c, s, t)
 
                 # Only one teacher can be assigned to a class-subject pair
-                self.model.Add(sum(teacher_vars.values()) == 1)
+                self.model.AddExactlyOne(teacher_vars.values())
+                self.teacher_choice_vars[(c, s)] = teacher_vars
 
                 # For each teacher, collect all their possible assignments for this class-subject
                 for t in valid_teachers:
-                    t_assignments = []
-                    for r in range(len(self.rooms)):
-                        for d in range(len(self.days)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    t_assignments.append(self.assignment_vars[key])
+                    t_assignments = self.vars_by_cst.get((c, s, t), [])
 
                     if t_assignments:
-                        # If any lesson for this teacher-subject-class exists, the teacher is assigned
-                        self.model.AddMaxEquality(teacher_vars[t], t_assignments)
+                        # An assigned teacher must teach at least one lesson for this subject-class
+                        self.model.AddBoolOr(t_assignments + [teacher_vars[t].Not()])
 
-                        # If the teacher is not assigned, they cannot teach any lessons
+                        # A lesson can only be taught by the assigned teacher. Since exactly one
+                        # teacher is assigned, this also rules out every other teacher's lessons
                         for assignment_var in t_assignments:
-                            self.model.Add(assignment_var == 0).OnlyEnforceIf(teacher_vars[t].Not())
-
-                        # If the teacher is assigned, they must teach all lessons for this subject-class
-                        # This is the key constraint that ensures teacher consistency
-                        for other_t in valid_teachers:
-                            if other_t != t:
-                                for r in range(len(self.rooms)):
-                                    for d in range(len(self.days)):
-                                        for ts in range(len(self.time_slots)):
-                                            key = (c, s, other_t, r, d, ts)
-                                            if key in self.assignment_vars:
-                                                self.model.Add(self.assignment_vars[key] == 0).OnlyEnforceIf(teacher_vars[t])
-
-                # Ensure each subject gets the correct number of hours per week
-                subject = self.subjects[s]
-                hours_per_week = subject.get('hoursPerWeek', 0)
-                logger.info(f"Subject {s_id} requires {hours_per_week} hours per week for class {class_id}")
-
-                # Count total hours for this class-subject across all teachers and days
-                total_hours_vars = []
-                for t in range(len(self.teachers)):
-                    for r in range(len(self.rooms)):
-                        for d in range(len(self.days)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    total_hours_vars.append(self.assignment_vars[key])
-
-                # Strict enforcement of hours per week
-                if total_hours_vars:
-                    self.model.Add(sum(total_hours_vars) == hours_per_week)
+                            self.model.AddImplication(assignment_var, teacher_vars[t])
+
+                # Hours per week are enforced once in _add_subject_hours_constraint
+                hours_per_week = self.subjects[s].get('hoursPerWeek', 0)
 
                 # Store the assignment for debugging
                 self.teacher_assignments[(class_id, s_id)] = {
@@ -289,6 +476,72 @@ class TimetableScheduler:
                     'hours_per_week': hours_per_week
                 }
 
+    def _add_symmetry_breaking_constraints(self) -> None:
+        """
+        Break symmetry between interchangeable teachers and rooms.
+
+        Teachers with the same subjects, hour limits and availability can swap their whole
+        timetables, so a teacher may only be chosen for a class-subject once the previous
+        teacher in their group has been chosen for an earlier one (value precedence).
+        Rooms with the same capacity and features are interchangeable, so a room is only
+        used if the previous equivalent room is used somewhere in the week.
+        """
+        logger.info("Adding symmetry breaking constraints...")
+
+        teacher_groups: Dict[Tuple[Any, ...], List[int]] = defaultdict(list)
+        for t, teacher in enumerate(self.teachers):
+            availability: List[Dict[str, Any]] = teacher.get('availability', [])
+            available_slots = frozenset(
+                (avail.get('day'), slot.get('startTime'), slot.get('endTime'))
+                for avail in availability
+                for slot in avail.get('timeSlots', [])
+            )
+            signature = (
+                frozenset(teacher.get('subjects', [])),
+                teacher.get('maxHoursPerDay', 5),
+                teacher.get('maxHoursPerWeek', 20),
+                bool(availability),
+                available_slots,
+            )
+            teacher_groups[signature].append(t)
+
+        for group in teacher_groups.values():
+            for prev_t, t in zip(group, group[1:]):
+                # prev_seen is true only if prev_t is chosen for this or an earlier class-subject
+                prev_seen: Any = None
+                for (c, s), teacher_vars in self.teacher_choice_vars.items():
+                    if t not in teacher_vars:
+                        continue
+                    if prev_seen is None:
+                        self.model.Add(teacher_vars[t] == 0)
+                    else:
+                        self.model.AddImplication(teacher_vars[t], prev_seen)
+                    seen: cp_model.IntVar = self._new_bool_var("t{}_seen_c{}_s{}", prev_t, c, s)
+                    self.model.AddBoolOr([seen.Not(), teacher_vars[prev_t]] + ([prev_seen] if prev_seen is not None else []))
+                    prev_seen = seen
+
+        if not self.use_room_constraints:
+            return
+
+        room_groups: Dict[Tuple[Any, ...], List[int]] = defaultdict(list)
+        for r, room in enumerate(self.rooms):
+            room_groups[(room.get('capacity'), frozenset(room.get('features') or []))].append(r)
+
+        vars_by_r: Dict[int, List[cp_model.IntVar]] = defaultdict(list)
+        for (r, _, _), room_vars in self.vars_by_rdts.items():
+            vars_by_r[r].extend(room_vars)
+
+        for group in room_groups.values():
+            room_used: Dict[int, cp_model.IntVar] = {}
+            for r in group:
+                room_used[r] = self._new_bool_var("r{}_used", r)
+                # room_used is true exactly when some lesson is held in the room
+                self.model.AddBoolOr(vars_by_r[r] + [room_used[r].Not()])
+                for var in vars_by_r[r]:
+                    self.model.AddImplication(var, room_used[r])
+            for prev_r, r in zip(group, group[1:]):
+                self.model.AddImplication(room_used[r], room_used[prev_r])
+
     def _add_subject_hours_constraint(self) -> None:
         """
         Ensure each class is scheduled for the required number of hours per subject.
@@ -314,23 +567,16 @@ class TimetableScheduler:
                 hours_per_week: int = subject.get('hoursPerWeek', 0)
 
                 if hours_per_week <= 0:
+                    # Still enforced below so a zero-hour subject is never scheduled
                     logger.warning(f"Subject {s_id} has invalid hours per week: {hours_per_week}")
-                    continue
 
                 logger.info(f"Enforcing {hours_per_week} hours per week for subject {s_id} in class {class_id}")
 
-                subject_hours: List[cp_model.IntVar] = []
-                for t in range(len(self.teachers)):
-                    for r in range(len(self.rooms)):
-                        for d in range(len(self.days)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    subject_hours.append(self.assignment_vars[key])
+                subject_hours: List[cp_model.IntVar] = self.vars_by_cs.get((c, s), [])
 
                 if subject_hours:
                     # Strict enforcement of hours per week
-                    self.model.Add(sum(subject_hours) == hours_per_week)
+                    self.model.Add(cp_model.LinearExpr.Sum(subject_hours) == hours_per_week)
 
                     # Store for debugging
                     self.subject_hours_constraints[(class_id, s_id)] = {
@@ -345,125 +591,49 @@ class TimetableScheduler:
         Enforce that a teacher can teach at most one class in a time slot
         and does not exceed their daily and weekly limits.
         """
-        for t in range(len(self.teachers)):
-            for d in range(len(self.days)):
-                for ts in range(len(self.time_slots)):
-                    teacher_assignments: List[cp_model.IntVar] = []
-                    for c in range(len(self.classes)):
-                        for s in range(len(self.subjects)):
-                            for r in range(len(self.rooms)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    teacher_assignments.append(self.assignment_vars[key])
-                    if teacher_assignments:
-                        self.model.Add(sum(teacher_assignments) <= 1)
-
-        for t in range(len(self.teachers)):
-            teacher = self.teachers[t]
-            max_daily = teacher.get('maxHoursPerDay', 5)
-            for d in range(len(self.days)):
-                daily_assignments: List[cp_model.IntVar] = []
-                for c in range(len(self.classes)):
-                    for s in range(len(self.subjects)):
-                        for r in range(len(self.rooms)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    daily_assignments.append(self.assignment_vars[key])
-                if daily_assignments:
-                    self.model.Add(sum(daily_assignments) <= max_daily)
-
-        for t in range(len(self.teachers)):
-            teacher = self.teachers[t]
-            max_weekly = teacher.get('maxHoursPerWeek', 20)
-            weekly_assignments: List[cp_model.IntVar] = []
-            for c in range(len(self.classes)):
-                for s in range(len(self.subjects)):
-                    for r in range(len(self.rooms)):
-                        for d in range(len(self.days)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    weekly_assignments.append(self.assignment_vars[key])
-            if weekly_assignments:
-                self.model.Add(sum(weekly_assignments) <= max_weekly)
+        # Limits that cannot bind are skipped; a teacher teaches at most one lesson per slot,
+        # so a limit only matters when the teacher has more open slots than it allows
+        daily_slots: Dict[Tuple[int, int], int] = defaultdict(int)
+        weekly_slots: Dict[int, int] = defaultdict(int)
+        for (t, d, _), teacher_assignments in self.vars_by_tdts.items():
+            daily_slots[(t, d)] += 1
+            weekly_slots[t] += 1
+            if len(teacher_assignments) > 1:
+                self.model.AddAtMostOne(teacher_assignments)
+
+        for (t, d), daily_assignments in self.vars_by_td.items():
+            max_daily = self.teachers[t].get('maxHoursPerDay', 5)
+            if daily_slots[(t, d)] > max_daily:
+                self.model.Add(cp_model.LinearExpr.Sum(daily_assignments) <= max_daily)
+
+        for t, weekly_assignments in self.vars_by_t.items():
+            max_weekly = self.teachers[t].get('maxHoursPerWeek', 20)
+            if weekly_slots[t] > max_weekly:
+                self.model.Add(cp_model.LinearExpr.Sum(weekly_assignments) <= max_weekly)
 
     def _add_class_constraints(self) -> None:
         """
         Ensure no class is scheduled for more than one subject in a time slot.
+        When the exact number of lessons per day equals the open slots that day, every slot is filled.
         """
-        for c in range(len(self.classes)):
-            for d in range(len(self.days)):
-                for ts in range(len(self.time_slots)):
-                    class_assignments: List[cp_model.IntVar] = []
-                    for s in range(len(self.subjects)):
-                        for t in range(len(self.teachers)):
-                            for r in range(len(self.rooms)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    class_assignments.append(self.assignment_vars[key])
-                    if class_assignments:
-                        self.model.Add(sum(class_assignments) <= 1)
+        exact_lessons_per_day: Any = self.school_settings.get('exactLessonsPerDay')
+        open_slots_per_day: Dict[Tuple[int, int], int] = defaultdict(int)
+        for c, d, _ in self.vars_by_cdts:
+            open_slots_per_day[(c, d)] += 1
+
+        for (c, d, _), class_assignments in self.vars_by_cdts.items():
+            if exact_lessons_per_day is not None and exact_lessons_per_day == open_slots_per_day[(c, d)]:
+                self.model.AddExactlyOne(class_assignments)
+            elif len(class_assignments) > 1:
+                self.model.AddAtMostOne(class_assignments)
 
     def _add_room_constraints(self) -> None:
         """
         Ensure that each room is used by at most one class at any time.
         """
-        for r in range(len(self.rooms)):
-            for d in range(len(self.days)):
-                for ts in range(len(self.time_slots)):
-                    room_assignments: List[cp_model.IntVar] = []
-                    for c in range(len(self.classes)):
-                        for s in range(len(self.subjects)):
-                            for t in range(len(self.teachers)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    room_assignments.append(self.assignment_vars[key])
-                    if room_assignments:
-                        self.model.Add(sum(room_assignments) <= 1)
-
-    def _add_break_constraints(self) -> None:
-        """
-        Prevent scheduling during breakfast and lunch break time slots.
-        """
-        has_breakfast_break: bool = self.school_settings['hasBreakfastBreak']
-        breakfast_break_start: str = self.school_settings['breakfastBreakStartTime']
-        breakfast_break_duration: int = self.school_settings['breakfastBreakDuration']
-        lunch_break_start: str = self.school_settings['lunchBreakStartTime']
-        lunch_break_duration: int = self.school_settings['lunchBreakDuration']
-
-        def time_to_minutes(time_str: str) -> int:
-            hours, minutes = map(int, time_str.split(':'))
-            return hours * 60 + minutes
-
-        breakfast_start: int = time_to_minutes(breakfast_break_start)
-        breakfast_end: int = breakfast_start + breakfast_break_duration
-        lunch_start: int = time_to_minutes(lunch_break_start)
-        lunch_end: int = lunch_start + lunch_break_duration
-
-        for d in range(len(self.days)):
-            for ts in range(len(self.time_slots)):
-                slot_start, slot_end = self.time_slots[ts]
-                slot_start_minutes: int = time_to_minutes(slot_start)
-                slot_end_minutes: int = time_to_minutes(slot_end)
-
-                if has_breakfast_break and (slot_start_minutes < breakfast_end and slot_end_minutes > breakfast_start):
-                    for c in range(len(self.classes)):
-                        for s in range(len(self.subjects)):
-                            for t in range(len(self.teachers)):
-                                for r in range(len(self.rooms)):
-                                    key = (c, s, t, r, d, ts)
-                                    if key in self.assignment_vars:
-                                        self.model.Add(self.assignment_vars[key] == 0)
-
-                if slot_start_minutes < lunch_end and slot_end_minutes > lunch_start:
-                    for c in range(len(self.classes)):
-                        for s in range(len(self.subjects)):
-                            for t in range(len(self.teachers)):
-                                for r in range(len(self.rooms)):
-                                    key = (c, s, t, r, d, ts)
-                                    if key in self.assignment_vars:
-                                        self.model.Add(self.assignment_vars[key] == 0)
+        for room_assignments in self.vars_by_rdts.values():
+            if len(room_assignments) > 1:
+                self.model.AddAtMostOne(room_assignments)
 
     def _add_daily_lessons_constraints(self) -> None:
         """
@@ -477,48 +647,50 @@ class TimetableScheduler:
 
         for c in range(len(self.classes)):
             for d in range(len(self.days)):
-                class_day_subjects: Dict[int, cp_model.IntVar] = {}
-                for s in range(len(self.subjects)):
-                    var_name: str = f"c{c}_d{d}_s{s}_taught"
-                    subject_taught: cp_model.IntVar = self.model.NewBoolVar(var_name)
-                    subject_assignments: List[cp_model.IntVar] = []
-                    for t in range(len(self.teachers)):
-                        for r in range(len(self.rooms)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    subject_assignments.append(self.assignment_vars[key])
-                    if subject_assignments:
-                        self.model.Add(sum(subject_assignments) >= 1).OnlyEnforceIf(subject_taught)
-                        self.model.Add(sum(subject_assignments) == 0).OnlyEnforceIf(subject_taught.Not())
-                        class_day_subjects[s] = subject_taught
-                if class_day_subjects:
-                    if min_subjects_per_day is not None:
-                        self.model.Add(sum(class_day_subjects.values()) >= min_subjects_per_day)
-                    self.model.Add(sum(class_day_subjects.values()) <= max_subjects_per_day)
+                subject_groups: List[Tuple[int, List[cp_model.IntVar]]] = [
+                    (s, self.vars_by_csd[(c, s, d)]) for s in range(len(self.subjects)) if (c, s, d) in self.vars_by_csd
+                ]
+                # A class has at most one lesson per slot, so the maximum only matters when more
+                # subjects than allowed could be taught on this day
+                need_min: bool = min_subjects_per_day is not None
+                need_max: bool = max_subjects_per_day < min(len(subject_groups), len(self.time_slots))
+                if subject_groups and (need_min or need_max):
+                    class_day_subjects: List[cp_model.IntVar] = []
+                    for s, subject_assignments in subject_groups:
+                        subject_taught: cp_model.IntVar = self._new_bool_var("c{}_d{}_s{}_taught", c, d, s)
+                        subject_total = cp_model.LinearExpr.Sum(subject_assignments)
+                        # Counting towards the minimum requires an actual lesson
+                        if need_min:
+                            self.model.Add(subject_total >= 1).OnlyEnforceIf(subject_taught)
+                        # Any lesson counts towards the maximum
+                        if need_max:
+                            self.model.Add(subject_total == 0).OnlyEnforceIf(subject_taught.Not())
+                        class_day_subjects.append(subject_taught)
+
+                    subjects_taught = cp_model.LinearExpr.Sum(class_day_subjects)
+                    if need_min:
+                        self.model.Add(subjects_taught >= min_subjects_per_day)
+                    if need_max:
+                        self.model.Add(subjects_taught <= max_subjects_per_day)
 
                 if exact_lessons_per_day is not None:
-                    lesson_vars: List[cp_model.IntVar] = []
-                    for s in range(len(self.subjects)):
-                        for t in range(len(self.teachers)):
-                            for r in range(len(self.rooms)):
-                                for ts in range(len(self.time_slots)):
-                                    key = (c, s, t, r, d, ts)
-                                    if key in self.assignment_vars:
-                                        lesson_vars.append(self.assignment_vars[key])
+                    lesson_vars: List[cp_model.IntVar] = self.vars_by_cd.get((c, d), [])
                     if lesson_vars:
-                        self.model.Add(sum(lesson_vars) == exact_lessons_per_day)
+                        self.model.Add(cp_model.LinearExpr.Sum(lesson_vars) == exact_lessons_per_day)
 
-    def _add_free_period_constraints(self) -> None:
+    def _compute_blocked_slot_mask(self) -> np.ndarray:
         """
-        Block time slots as per configured free periods.
+        Mark the (class, day, time slot) cells that overlap a break or a free period for the class.
+
+        Returns:
+            np.ndarray: Boolean array of shape (classes, days, time slots).
         """
-        if not self.free_periods:
-            return
+        break_mask: np.ndarray = slot_overlap_mask(self.slot_start_minutes, self.slot_end_minutes, *self.lunch_break_minutes)
+        if self.breakfast_break_minutes is not None:
+            break_mask |= slot_overlap_mask(self.slot_start_minutes, self.slot_end_minutes, *self.breakfast_break_minutes)
 
-        def time_to_minutes(time_str: str) -> int:
-            hours, minutes = map(int, time_str.split(':'))
-            return hours * 60 + minutes
+        blocked: np.ndarray = np.zeros((len(self.classes), len(self.days), len(self.time_slots)), dtype=bool)
+        blocked |= break_mask
 
         for period in self.free_periods:
             period_name: str = period.get('name', 'Unnamed Period')
@@ -531,24 +703,15 @@ class TimetableScheduler:
                 continue
 
             period_start_minutes: int = time_to_minutes(period_start)
-            period_end_minutes: int = period_start_minutes + period_duration
-
-            for d, day in enumerate(self.days):
-                if day in period_days or "all" in period_days:
-                    for ts, (slot_start, slot_end) in enumerate(self.time_slots):
-                        slot_start_minutes: int = time_to_minutes(slot_start)
-                        slot_end_minutes: int = time_to_minutes(slot_end)
-                        if slot_start_minutes < period_end_minutes and slot_end_minutes > period_start_minutes:
-                            for c in range(len(self.classes)):
-                                class_info = self.classes[c]
-                                class_id: str = class_info.get('id')
-                                if "all" in affected_classes or class_id in affected_classes:
-                                    for s in range(len(self.subjects)):
-                                        for t in range(len(self.teachers)):
-                                            for r in range(len(self.rooms)):
-                                                key = (c, s, t, r, d, ts)
-                                                if key in self.assignment_vars:
-                                                    self.model.Add(self.assignment_vars[key] == 0)
+            period_mask: np.ndarray = slot_overlap_mask(
+                self.slot_start_minutes, self.slot_end_minutes, period_start_minutes, period_start_minutes + period_duration
+            )
+            class_mask: np.ndarray = np.array(
+                ["all" in affected_classes or class_info.get('id') in affected_classes for class_info in self.classes], dtype=bool
+            )
+            day_mask: np.ndarray = np.array([day in period_days or "all" in period_days for day in self.days], dtype=bool)
+            blocked |= class_mask[:, None, None] & day_mask[None, :, None] & period_mask[None, None, :]
+        return blocked
 
     def _add_balanced_distribution_constraint(self) -> None:
         """
@@ -568,19 +731,14 @@ class TimetableScheduler:
                 s: int = self.subject_indices[s_id]
                 subject: Dict[str, Any] = self.subjects[s]
                 hours_per_week: int = subject.get('hoursPerWeek', 0)
-                if hours_per_week < 2:
+                # When the hours fit one lesson a day, the no-repeat constraint is already tighter
+                if hours_per_week < 2 or hours_per_week <= len(self.days):
                     continue
                 max_per_day: int = min(2, hours_per_week - 1)
                 for d in range(len(self.days)):
-                    subject_day_lessons: List[cp_model.IntVar] = []
-                    for t in range(len(self.teachers)):
-                        for r in range(len(self.rooms)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    subject_day_lessons.append(self.assignment_vars[key])
-                    if subject_day_lessons:
-                        self.model.Add(sum(subject_day_lessons) <= max_per_day)
+                    subject_day_lessons: List[cp_model.IntVar] = self.vars_by_csd.get((c, s, d), [])
+                    if max_per_day < len(subject_day_lessons):
+                        self.model.Add(cp_model.LinearExpr.Sum(subject_day_lessons) <= max_per_day)
 
     def _add_heavy_subjects_morning_preference(self) -> None:
         """
@@ -593,54 +751,18 @@ class TimetableScheduler:
         if not (prefer_morning and heavy_subjects):
             return
 
-        morning_slots: List[int] = [ts for ts, (slot_start, _) in enumerate(self.time_slots) if int(slot_start.split(':')[0]) < 12]
+        morning_slots: Set[int] = {ts for ts, (slot_start_minutes, _) in enumerate(self.time_slots_minutes) if slot_start_minutes < 12 * 60}
         if not morning_slots:
             return
+        afternoon_slots: List[int] = [ts for ts in range(len(self.time_slots)) if ts not in morning_slots]
 
         self.heavy_subjects_afternoon_keys: List[cp_model.IntVar] = []
-        heavy_subject_indices: List[int] = [self.subject_indices[s] for s in heavy_subjects if s in self.subject_indices]
+        heavy_subject_indices: Set[int] = {self.subject_indices[s] for s in heavy_subjects if s in self.subject_indices}
         for c in range(len(self.classes)):
             for s in heavy_subject_indices:
                 for d in range(len(self.days)):
-                    for t in range(len(self.teachers)):
-                        for r in range(len(self.rooms)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars and ts not in morning_slots:
-                                    self.heavy_subjects_afternoon_keys.append(self.assignment_vars[key])
-
-    def _add_teacher_availability_schedule_constraint(self) -> None:
-        """
-        Enforce teacher availability based on provided schedule constraints.
-        Assignment variables corresponding to (day, slot) combinations outside a teacher's availability
-        are forced to 0.
-        """
-        for t in range(len(self.teachers)):
-            teacher = self.teachers[t]
-            availability: List[Dict[str, Any]] = teacher.get('availability', [])
-            if not availability:
-                continue
-            available_slots: set = set()
-            for avail in availability:
-                day: str = avail.get('day')
-                if day not in self.day_indices:
-                    continue
-                day_idx: int = self.day_indices[day]
-                time_slots_list: List[Dict[str, str]] = avail.get('timeSlots', [])
-                for slot in time_slots_list:
-                    start_time: str = slot.get('startTime')
-                    end_time: str = slot.get('endTime')
-                    if (start_time, end_time) in self.time_slot_indices:
-                        ts_idx: int = self.time_slot_indices[(start_time, end_time)]
-                        available_slots.add((day_idx, ts_idx))
-            for c in range(len(self.classes)):
-                for s in range(len(self.subjects)):
-                    for r in range(len(self.rooms)):
-                        for d in range(len(self.days)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars and (d, ts) not in available_slots:
-                                    self.model.Add(self.assignment_vars[key] == 0)
+                    for ts in afternoon_slots:
+                        self.heavy_subjects_afternoon_keys.extend(self.vars_by_csdts.get((c, s, d, ts), ()))
 
     def _add_no_repeat_subject_constraint(self) -> None:
         """
@@ -654,51 +776,26 @@ class TimetableScheduler:
 
         # For each class and day, ensure each subject is scheduled at most once
         for c in range(len(self.classes)):
-            class_info = self.classes[c]
-            class_id = class_info.get('id')
-
             for d in range(len(self.days)):
-                day = self.days[d]
-
-                # For each subject, create a variable indicating if it's taught on this day
-                subject_taught_today = {}
                 for s in range(len(self.subjects)):
                     subject_id = self.subject_ids.get(s)
                     if not subject_id:
                         continue
 
-                    # Create a variable for each subject indicating if it's taught on this day
-                    var_name = f"subject_{subject_id}_taught_c{c}_d{d}"
-                    subject_taught_today[s] = self.model.NewBoolVar(var_name)
-
                     # Collect all assignment variables for this subject on this day
-                    subject_assignments = []
-                    for t in range(len(self.teachers)):
-                        for r in range(len(self.rooms)):
-                            for ts in range(len(self.time_slots)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    subject_assignments.append(self.assignment_vars[key])
+                    subject_assignments = self.vars_by_csd.get((c, s, d), [])
 
-                    if subject_assignments:
-                        # If any assignment is 1, the subject is taught today
-                        self.model.Add(sum(subject_assignments) >= 1).OnlyEnforceIf(subject_taught_today[s])
-                        self.model.Add(sum(subject_assignments) == 0).OnlyEnforceIf(subject_taught_today[s].Not())
-
-                        # Constraint: Each subject can be taught at most once per day per class
-                        self.model.Add(sum(subject_assignments) <= 1)
+                    # Nothing to limit with a single candidate, or when the weekly hours
+                    # equality already allows at most one lesson in total
+                    if len(subject_assignments) <= 1 or self.subjects[s].get('hoursPerWeek', 0) <= 1:
+                        continue
 
-                # Log the constraint for debugging
-                logger.info(f"Added constraint: Each subject taught at most once per day for class {class_id} on {day}")
+                    # Constraint: Each subject can be taught at most once per day per class
+                    self.model.AddAtMostOne(subject_assignments)
 
         # Prevent back-to-back scheduling of the same subject
         for c in range(len(self.classes)):
-            class_info = self.classes[c]
-            class_id = class_info.get('id')
-
             for d in range(len(self.days)):
-                day = self.days[d]
-
                 # For consecutive time slots
                 for ts in range(len(self.time_slots) - 1):
                     # For each subject
@@ -708,30 +805,16 @@ class TimetableScheduler:
                             continue
 
                         # Collect assignments for this subject in current time slot
-                        current_slot_assignments = []
-                        for t in range(len(self.teachers)):
-                            for r in range(len(self.rooms)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    current_slot_assignments.append(self.assignment_vars[key])
+                        current_slot_assignments = self.vars_by_csdts.get((c, s, d, ts), [])
 
                         # Collect assignments for this subject in next time slot
-                        next_slot_assignments = []
-                        for t in range(len(self.teachers)):
-                            for r in range(len(self.rooms)):
-                                key = (c, s, t, r, d, ts + 1)
-                                if key in self.assignment_vars:
-                                    next_slot_assignments.append(self.assignment_vars[key])
-
-                        # If both slots have assignments, prevent them from both being 1
+                        next_slot_assignments = self.vars_by_csdts.get((c, s, d, ts + 1), [])
+
+                        # If both slots have assignments, at most one lesson may cover the pair
                         if current_slot_assignments and next_slot_assignments:
-                            for current_var in current_slot_assignments:
-                                for next_var in next_slot_assignments:
-                                    # Cannot have the same subject in consecutive slots
-                                    self.model.Add(current_var + next_var <= 1)
+                            self.model.AddAtMostOne(current_slot_assignments + next_slot_assignments)
 
-                # Log the constraint for debugging
-                logger.info(f"Added constraint: No back-to-back same subject for class {class_id} on {day}")
+        logger.info(f"Added no-repeat subject constraints for {len(self.classes)} classes across {len(self.days)} days")
 
     def _add_objective(self) -> None:
         """
@@ -739,7 +822,7 @@ class TimetableScheduler:
         subjects assigned in the afternoon.
         """
         logger.info("Adding objective function...")
-        objective_terms: List[Any] = []
+        objective_vars: List[cp_model.IntVar] = []
         objective_weights: List[int] = []
 
         teacher_gap_vars: List[cp_model.IntVar] = []
@@ -747,69 +830,207 @@ class TimetableScheduler:
             for d in range(len(self.days)):
                 active_slots: List[cp_model.IntVar] = []
                 for ts in range(len(self.time_slots)):
-                    slot_vars: List[cp_model.IntVar] = []
-                    for c in range(len(self.classes)):
-                        for s in range(len(self.subjects)):
-                            for r in range(len(self.rooms)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    slot_vars.append(self.assignment_vars[key])
-                    if slot_vars:
-                        var_name: str = f"t{t}_d{d}_ts{ts}_active"
-                        is_active: cp_model.IntVar = self.model.NewBoolVar(var_name)
-                        self.model.Add(sum(slot_vars) >= 1).OnlyEnforceIf(is_active)
-                        self.model.Add(sum(slot_vars) == 0).OnlyEnforceIf(is_active.Not())
+                    slot_vars: List[cp_model.IntVar] = self.vars_by_tdts.get((t, d, ts), [])
+                    if len(slot_vars) == 1:
+                        # A single candidate lesson is its own activity indicator
+                        active_slots.append(slot_vars[0])
+                    elif slot_vars:
+                        is_active: cp_model.IntVar = self._new_bool_var("t{}_d{}_ts{}_active", t, d, ts)
+                        slot_total = cp_model.LinearExpr.Sum(slot_vars)
+                        self.model.Add(slot_total >= 1).OnlyEnforceIf(is_active)
+                        self.model.Add(slot_total == 0).OnlyEnforceIf(is_active.Not())
                         active_slots.append(is_active)
                 if len(active_slots) >= 3:
                     for i in range(1, len(active_slots) - 1):
-                        gap_var: cp_model.IntVar = self.model.NewBoolVar(f"t{t}_d{d}_ts{i}_gap")
-                        self.model.AddBoolAnd([active_slots[i-1], active_slots[i].Not(), active_slots[i+1]]).OnlyEnforceIf(gap_var)
-                        self.model.AddBoolOr([active_slots[i-1].Not(), active_slots[i], active_slots[i+1].Not()]).OnlyEnforceIf(gap_var.Not())
+                        gap_var: cp_model.IntVar = self._new_bool_var("t{}_d{}_ts{}_gap", t, d, i)
+                        # Lower bound only: the objective pushes gap_var down to 0 unless this is a gap
+                        self.model.Add(gap_var >= active_slots[i-1] - active_slots[i] + active_slots[i+1] - 1)
                         teacher_gap_vars.append(gap_var)
-        if teacher_gap_vars:
-            objective_terms.append(sum(teacher_gap_vars))
-            objective_weights.append(100)
+        objective_vars.extend(teacher_gap_vars)
+        objective_weights.extend([100] * len(teacher_gap_vars))
 
         class_gap_vars: List[cp_model.IntVar] = []
         for c in range(len(self.classes)):
             for d in range(len(self.days)):
                 active_slots: List[cp_model.IntVar] = []
                 for ts in range(len(self.time_slots)):
-                    slot_vars: List[cp_model.IntVar] = []
-                    for s in range(len(self.subjects)):
-                        for t in range(len(self.teachers)):
-                            for r in range(len(self.rooms)):
-                                key = (c, s, t, r, d, ts)
-                                if key in self.assignment_vars:
-                                    slot_vars.append(self.assignment_vars[key])
-                    if slot_vars:
-                        var_name: str = f"c{c}_d{d}_ts{ts}_active"
-                        is_active: cp_model.IntVar = self.model.NewBoolVar(var_name)
-                        self.model.Add(sum(slot_vars) >= 1).OnlyEnforceIf(is_active)
-                        self.model.Add(sum(slot_vars) == 0).OnlyEnforceIf(is_active.Not())
+                    slot_vars: List[cp_model.IntVar] = self.vars_by_cdts.get((c, d, ts), [])
+                    if len(slot_vars) == 1:
+                        # A single candidate lesson is its own activity indicator
+                        active_slots.append(slot_vars[0])
+                    elif slot_vars:
+                        is_active: cp_model.IntVar = self._new_bool_var("c{}_d{}_ts{}_active", c, d, ts)
+                        slot_total = cp_model.LinearExpr.Sum(slot_vars)
+                        self.model.Add(slot_total >= 1).OnlyEnforceIf(is_active)
+                        self.model.Add(slot_total == 0).OnlyEnforceIf(is_active.Not())
                         active_slots.append(is_active)
                 if len(active_slots) >= 3:
                     for i in range(1, len(active_slots) - 1):
-                        gap_var: cp_model.IntVar = self.model.NewBoolVar(f"c{c}_d{d}_ts{i}_gap")
-                        self.model.AddBoolAnd([active_slots[i-1], active_slots[i].Not(), active_slots[i+1]]).OnlyEnforceIf(gap_var)
-                        self.model.AddBoolOr([active_slots[i-1].Not(), active_slots[i], active_slots[i+1].Not()]).OnlyEnforceIf(gap_var.Not())
+                        gap_var: cp_model.IntVar = self._new_bool_var("c{}_d{}_ts{}_gap", c, d, i)
+                        # Lower bound only: the objective pushes gap_var down to 0 unless this is a gap
+                        self.model.Add(gap_var >= active_slots[i-1] - active_slots[i] + active_slots[i+1] - 1)
                         class_gap_vars.append(gap_var)
-        if class_gap_vars:
-            objective_terms.append(sum(class_gap_vars))
-            objective_weights.append(80)
-
-        if hasattr(self, "heavy_subjects_afternoon_keys") and self.heavy_subjects_afternoon_keys:
-            objective_terms.append(sum(self.heavy_subjects_afternoon_keys))
-            objective_weights.append(50)
-
-        if objective_terms:
-            weighted_sum = 0
-            for term, weight in zip(objective_terms, objective_weights):
-                weighted_sum += term * weight
-            self.model.Minimize(weighted_sum)
+        objective_vars.extend(class_gap_vars)
+        objective_weights.extend([80] * len(class_gap_vars))
+
+        heavy_afternoon_vars: List[cp_model.IntVar] = getattr(self, "heavy_subjects_afternoon_keys", [])
+        objective_vars.extend(heavy_afternoon_vars)
+        objective_weights.extend([50] * len(heavy_afternoon_vars))
+
+        if objective_vars:
+            self.model.Minimize(cp_model.LinearExpr.WeightedSum(objective_vars, objective_weights))
         else:
             self.model.Minimize(0)
 
+    def _add_solution_hint(self) -> None:
+        """
+        Hint CP-SAT with a starting schedule: lessons of the previous schedule where they still fit,
+        then a greedy first-fit placement of the remaining hours. The hint need not be feasible;
+        solverParams can enable repair_hint to make the solver repair it first.
+        """
+        class_busy: Set[Tuple[int, int, int]] = set()
+        teacher_busy: Set[Tuple[int, int, int]] = set()
+        room_busy: Set[Tuple[int, int, int]] = set()
+        subject_days: Set[Tuple[int, int, int]] = set()
+        teacher_day_load: Dict[Tuple[int, int], int] = defaultdict(int)
+        teacher_week_load: Dict[int, int] = defaultdict(int)
+        placed_hours: Dict[Tuple[int, int], int] = defaultdict(int)
+        chosen_teacher: Dict[Tuple[int, int], int] = {}
+        hinted_keys: List[int] = []
+
+        def place(c: int, s: int, t: int, r: int, d: int, ts: int) -> bool:
+            key: int = self._pack(c, s, t, r, d, ts)
+            teacher: Dict[str, Any] = self.teachers[t]
+            if (key not in self.assignment_vars or (c, d, ts) in class_busy or (t, d, ts) in teacher_busy
+                    or (r, d, ts) in room_busy or (c, s, d) in subject_days
+                    or teacher_day_load[(t, d)] >= teacher.get('maxHoursPerDay', 5)
+                    or teacher_week_load[t] >= teacher.get('maxHoursPerWeek', 20)):
+                return False
+            class_busy.add((c, d, ts))
+            teacher_busy.add((t, d, ts))
+            if self.use_room_constraints:
+                room_busy.add((r, d, ts))
+            subject_days.add((c, s, d))
+            teacher_day_load[(t, d)] += 1
+            teacher_week_load[t] += 1
+            placed_hours[(c, s)] += 1
+            chosen_teacher[(c, s)] = t
+            hinted_keys.append(key)
+            return True
+
+        rooms: range = range(len(self.rooms)) if self.use_room_constraints else range(1)
+
+        # Keep the previous schedule's lessons first so a re-solve starts from it
+        for entry in self.previous_schedule.get('entries', []):
+            c = self.class_indices.get(entry.get('classId'))
+            s = self.subject_indices.get(entry.get('subjectId'))
+            t = self.teacher_indices.get(entry.get('teacherId'))
+            d = self.day_indices.get(entry.get('day'))
+            ts = self.time_slot_indices.get((entry.get('startTime'), entry.get('endTime')))
+            r = self.room_indices.get(entry.get('roomId')) if self.use_room_constraints else 0
+            if None in (c, s, t, r, d, ts) or chosen_teacher.get((c, s), t) != t:
+                continue
+            if placed_hours[(c, s)] < self.subjects[s].get('hoursPerWeek', 0):
+                place(c, s, t, r, d, ts)
+
+        # Fill the remaining hours first-fit, giving each class subject its least loaded teacher
+        for (c, s), teacher_vars in self.teacher_choice_vars.items():
+            hours_per_week: int = self.subjects[s].get('hoursPerWeek', 0)
+            if (c, s) in chosen_teacher:
+                t = chosen_teacher[(c, s)]
+            else:
+                t = min(teacher_vars, key=lambda candidate: teacher_week_load[candidate])
+            for d in range(len(self.days)):
+                if placed_hours[(c, s)] >= hours_per_week:
+                    break
+                for ts in range(len(self.time_slots)):
+                    if any(place(c, s, t, r, d, ts) for r in rooms):
+                        break
+
+        for key in hinted_keys:
+            self.model.AddHint(self.assignment_vars[key], 1)
+        for (c, s), t in chosen_teacher.items():
+            teacher_vars = self.teacher_choice_vars.get((c, s), {})
+            if t in teacher_vars:
+                self.model.AddHint(teacher_vars[t], 1)
+        logger.info(f"Added solution hint with {len(hinted_keys)} lessons")
+
+    def _configure_solver(self) -> None:
+        """
+        Configure CP-SAT search parameters: parallel workers, time limit, seed and logging.
+        """
+        parameters = self.solver.parameters
+        parameters.num_workers = SOLVER_WORKERS or max(1, os.cpu_count() or 8)
+        parameters.max_time_in_seconds = float(self.school_settings.get('solverTimeLimitSeconds', 60.0))
+        parameters.random_seed = 1
+
+        # Route CP-SAT search progress through our logger when requested
+        parameters.log_search_progress = bool(self.school_settings.get('logSolver', False))
+        parameters.log_to_stdout = False
+        self.solver.log_callback = logger.info
+
+        # Per-school overrides, e.g. values found by tuning on a representative instance
+        solver_params_override: Dict[str, Any] = self.school_settings.get('solverParams') or {}
+        for name, value in solver_params_override.items():
+            try:
+                setattr(parameters, name, value)
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning(f"Ignoring invalid solver parameter {name}={value!r}: {e}")
+
+    def _model_cache_key(self) -> str:
+        """
+        Hash the scheduling input that determines the built model.
+
+        Returns:
+            str: Hex digest identifying the input.
+        """
+        payload: Dict[str, Any] = {
+            'school_settings': self.school_settings,
+            'teachers': self.teachers,
+            'classes': self.classes,
+            'subjects': self.subjects,
+            'rooms': self.rooms,
+            'previous_schedule': self.previous_schedule,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _load_cached_model(self, cache_key: str) -> bool:
+        """
+        Reuse a model built earlier for the same input, if one is cached.
+
+        Args:
+            cache_key (str): Key from _model_cache_key.
+
+        Returns:
+            bool: True if the cached model was loaded.
+        """
+        with _model_cache_lock:
+            cached = _model_cache.get(cache_key)
+            if cached is None:
+                return False
+            _model_cache.move_to_end(cache_key)
+            model, var_indices = cached
+            # Clone so concurrent solves never share a model
+            self.model = model.Clone()
+
+        self.assignment_vars = {key: self.model.GetBoolVarFromProtoIndex(index) for key, index in var_indices.items()}
+        logger.info(f"Reusing cached model with {len(self.assignment_vars)} assignment variables")
+        return True
+
+    def _store_cached_model(self, cache_key: str) -> None:
+        """
+        Cache the built model for later solves of the same input.
+
+        Args:
+            cache_key (str): Key from _model_cache_key.
+        """
+        var_indices: Dict[int, int] = {key: var.Index() for key, var in self.assignment_vars.items()}
+        with _model_cache_lock:
+            _model_cache[cache_key] = (self.model.Clone(), var_indices)
+            _model_cache.move_to_end(cache_key)
+            while len(_model_cache) > MODEL_CACHE_SIZE:
+                _model_cache.popitem(last=False)
+
     def solve(self) -> bool:
         """
         Solve the scheduling model.
@@ -817,12 +1038,16 @@ class TimetableScheduler:
         Returns:
             bool: True if a solution was found, False otherwise.
         """
-        logger.info("Creating variables and adding constraints...")
-        self._create_variables()
-        self._add_all_constraints()
-        self._add_objective()
-
-        self.solver.parameters.max_time_in_seconds = 60.0
+        cache_key: str = self._model_cache_key()
+        if not self._load_cached_model(cache_key):
+            logger.info("Creating variables and adding constraints...")
+            self._create_variables()
+            self._add_all_constraints()
+            self._add_objective()
+            self._add_solution_hint()
+            self._store_cached_model(cache_key)
+
+        self._configure_solver()
         logger.info("Solving the model...")
         self.status = self.solver.Solve(self.model)
 
@@ -852,21 +1077,20 @@ class TimetableScheduler:
 
         # Track teacher assignments for validation
         teacher_subject_assignments = {}
-        subject_hours_count = {}
 
         # Track subjects scheduled per class per day to validate no-repeat constraint
-        subjects_per_class_day = {}
+        subjects_per_class_day: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
 
-        # Track time slots for each class-day to check for back-to-back subjects
-        class_day_time_slots = {}
+        # Solved (c, s, t, r, d, ts) index tuples for the hours and back-to-back checks
+        solved_keys: List[Tuple[int, int, int, int, int, int]] = []
 
         for key, var in self.assignment_vars.items():
             if self.solver.Value(var) == 1:
-                c, s, t, r, d, ts = key
+                c, s, t, r, d, ts = self._unpack(key)
+                solved_keys.append((c, s, t, r, d, ts))
                 class_id: str = self.class_ids[c]
                 subject_id: str = self.subject_ids[s]
                 teacher_id: str = self.teacher_ids[t]
-                room_id: str = self.room_ids[r]
                 day: str = self.days[d]
                 start_time, end_time = self.time_slots[ts]
 
@@ -878,32 +1102,16 @@ class TimetableScheduler:
                     logger.warning(f"INCONSISTENCY: Class {class_id}, Subject {subject_id} has multiple teachers: "
                                   f"{teacher_subject_assignments[key]} and {teacher_id}")
 
-                # Track subject hours for validation
-                if key not in subject_hours_count:
-                    subject_hours_count[key] = 1
-                else:
-                    subject_hours_count[key] += 1
-
                 # Track subjects per class per day to validate no-repeat constraint
                 class_day_key = (class_id, day)
-                if class_day_key not in subjects_per_class_day:
-                    subjects_per_class_day[class_day_key] = {subject_id: 1}
-                else:
-                    if subject_id in subjects_per_class_day[class_day_key]:
-                        subjects_per_class_day[class_day_key][subject_id] += 1
-                        logger.warning(f"REPEAT SUBJECT: Class {class_id} has subject {subject_id} scheduled "
-                                      f"{subjects_per_class_day[class_day_key][subject_id]} times on {day}")
-                    else:
-                        subjects_per_class_day[class_day_key][subject_id] = 1
-
-                # Track time slots for each class-day to check for back-to-back subjects
-                if class_day_key not in class_day_time_slots:
-                    class_day_time_slots[class_day_key] = [(ts, subject_id)]
-                else:
-                    class_day_time_slots[class_day_key].append((ts, subject_id))
+                subject_counts = subjects_per_class_day[class_day_key]
+                subject_counts[subject_id] += 1
+                if subject_counts[subject_id] > 1:
+                    logger.warning(f"REPEAT SUBJECT: Class {class_id} has subject {subject_id} scheduled "
+                                  f"{subject_counts[subject_id]} times on {day}")
 
                 if not self.use_room_constraints:
-                    class_name: str = next((cls["name"] for cls in self.classes if cls["id"] == class_id), f"Class {c}")
+                    class_name: str = self.class_by_id[class_id]["name"]
                     entry: Dict[str, Any] = {
                         "id": str(uuid.uuid4()),
                         "day": day,
@@ -924,47 +1132,39 @@ class TimetableScheduler:
                         "classId": class_id,
                         "subjectId": subject_id,
                         "teacherId": teacher_id,
-                        "roomId": room_id
+                        "roomId": self.room_ids[r]
                     }
                 schedule["entries"].append(entry)
 
-        # Validate subject hours
-        for (class_id, subject_id), hours in subject_hours_count.items():
-            expected_hours = 0
-            for subject in self.subjects:
-                if subject['id'] == subject_id:
-                    expected_hours = subject.get('hoursPerWeek', 0)
-                    break
-
-            if hours != expected_hours:
-                logger.warning(f"HOURS MISMATCH: Class {class_id}, Subject {subject_id} has {hours} hours "
-                              f"but expected {expected_hours} hours")
-
-        # Check for back-to-back same subjects
-        for class_day_key, time_slots in class_day_time_slots.items():
-            class_id, day = class_day_key
-            # Sort by time slot index
-            time_slots.sort()
-
-            # Check consecutive slots
-            for i in range(len(time_slots) - 1):
-                current_ts, current_subject = time_slots[i]
-                next_ts, next_subject = time_slots[i + 1]
-
-                # If consecutive time slots have the same subject
-                if current_ts + 1 == next_ts and current_subject == next_subject:
-                    logger.warning(f"BACK-TO-BACK: Class {class_id} has subject {current_subject} scheduled "
-                                  f"in consecutive time slots on {day}")
-
-        # Log teacher assignments for verification
-        logger.info("Teacher assignments in final schedule:")
-        for (class_id, subject_id), teacher_id in teacher_subject_assignments.items():
-            logger.info(f"  Class {class_id}, Subject {subject_id} -> Teacher {teacher_id}")
-
-        # Log subject distribution per day
-        logger.info("Subject distribution per day:")
-        for (class_id, day), subjects in subjects_per_class_day.items():
-            logger.info(f"  Class {class_id} on {day}: {len(subjects)} different subjects")
+        solved: np.ndarray = np.array(solved_keys, dtype=np.int32).reshape(-1, 6)
+
+        # Validate subject hours for every scheduled class-subject pair
+        hours_count: np.ndarray = np.zeros((len(self.classes), len(self.subjects)), dtype=np.int32)
+        np.add.at(hours_count, (solved[:, 0], solved[:, 1]), 1)
+        expected_hours: np.ndarray = np.array([subject.get('hoursPerWeek', 0) for subject in self.subjects], dtype=np.int32)
+        for c, s in np.argwhere((hours_count > 0) & (hours_count != expected_hours)):
+            logger.warning(f"HOURS MISMATCH: Class {self.class_ids[c]}, Subject {self.subject_ids[s]} has "
+                          f"{hours_count[c, s]} hours but expected {expected_hours[s]} hours")
+
+        # Check for back-to-back same subjects: order by class, day and time slot, then compare neighbours
+        ordered: np.ndarray = solved[np.lexsort((solved[:, 5], solved[:, 4], solved[:, 0]))]
+        back_to_back: np.ndarray = ((ordered[1:, 0] == ordered[:-1, 0]) & (ordered[1:, 4] == ordered[:-1, 4])
+                                    & (ordered[1:, 5] == ordered[:-1, 5] + 1) & (ordered[1:, 1] == ordered[:-1, 1]))
+        for i in np.flatnonzero(back_to_back):
+            c, s, _, _, d, _ = ordered[i]
+            logger.warning(f"BACK-TO-BACK: Class {self.class_ids[c]} has subject {self.subject_ids[s]} scheduled "
+                          f"in consecutive time slots on {self.days[d]}")
+
+        if logger.isEnabledFor(logging.DEBUG):
+            # Log teacher assignments for verification
+            logger.debug("Teacher assignments in final schedule:")
+            for (class_id, subject_id), teacher_id in teacher_subject_assignments.items():
+                logger.debug(f"  Class {class_id}, Subject {subject_id} -> Teacher {teacher_id}")
+
+            # Log subject distribution per day
+            logger.debug("Subject distribution per day:")
+            for (class_id, day), subjects in subjects_per_class_day.items():
+                logger.debug(f"  Class {class_id} on {day}: {len(subjects)} different subjects")
 
         return schedule
 
@@ -997,13 +1197,13 @@ class TimetableScheduler:
                     continue
 
                 # Find valid teachers for this subject
-                valid_teachers = [t for t in self.teachers if subject_id in t.get('subjects', [])]
+                valid_teachers = [self.teachers[t] for t in self.teachers_by_subject.get(subject_id, ())]
                 if not valid_teachers:
                     logger.warning(f"No valid teachers for subject {subject_id} in class {class_id}")
                     continue
 
                 # Assign a teacher consistently
-                teacher = np.random.choice(valid_teachers)
+                teacher = random.choice(valid_teachers)
                 assigned_teachers[(class_id, subject_id)] = teacher
                 assigned_hours[(class_id, subject_id)] = 0
 
@@ -1014,12 +1214,19 @@ class TimetableScheduler:
                 available_slots.append((day, time_slot))
 
         # Shuffle slots for randomness
-        np.random.shuffle(available_slots)
+        random.shuffle(available_slots)
+
+        # Occupancy lookups for the slot checks below
+        time_slot_index_by_start: Dict[str, int] = {ts[0]: i for i, ts in enumerate(self.time_slots)}
+        busy_teachers: Set[Tuple[str, str, str]] = set()
+        busy_classes: Set[Tuple[str, str, str]] = set()
+        class_day_subjects: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        class_day_slot_subject: Dict[Tuple[str, str, int], str] = {}
 
         # For each class-subject pair, assign the required hours
         for (class_id, subject_id), teacher in assigned_teachers.items():
             # Get the subject hours requirement
-            subject = next((s for s in self.subjects if s.get("id") == subject_id), None)
+            subject = self.subject_by_id.get(subject_id)
             if not subject:
                 continue
 
@@ -1028,84 +1235,52 @@ class TimetableScheduler:
                 continue
 
             # Get class info
-            class_info = next((c for c in self.classes if c.get("id") == class_id), None)
+            class_info = self.class_by_id.get(class_id)
             if not class_info:
                 continue
 
             # Assign hours up to the requirement
             hours_to_assign = hours_per_week
+            teacher_id = teacher.get("id")
             for slot_idx, (day, time_slot) in enumerate(available_slots):
                 if hours_to_assign <= 0:
                     break
 
-                # Check if this slot works for this class
-                valid_slot = True
-
-                # Check if teacher is already assigned in this slot
-                # Also check if this subject is already scheduled for this class on this day
-                # And check if this would create a back-to-back scheduling of the same subject
-                for existing_entry in mock_schedule["entries"]:
-                    # Teacher already busy in this time slot
-                    if (existing_entry["day"] == day and
-                        existing_entry["startTime"] == time_slot[0] and
-                        existing_entry["teacherId"] == teacher.get("id")):
-                        valid_slot = False
-                        break
+                start_time = time_slot[0]
 
-                    # Class already has a lesson in this time slot
-                    if (existing_entry["day"] == day and
-                        existing_entry["startTime"] == time_slot[0] and
-                        existing_entry["classId"] == class_id):
-                        valid_slot = False
-                        break
+                # Teacher or class already busy in this time slot
+                if (day, start_time, teacher_id) in busy_teachers or (day, start_time, class_id) in busy_classes:
+                    continue
 
-                    # Subject already scheduled for this class on this day
-                    if (existing_entry["day"] == day and
-                        existing_entry["classId"] == class_id and
-                        existing_entry["subjectId"] == subject_id):
-                        valid_slot = False
-                        break
+                # Subject already scheduled for this class on this day
+                if subject_id in class_day_subjects[(class_id, day)]:
+                    continue
 
-                    # Check for back-to-back scheduling of the same subject
-                    # Get the time slot before and after the current one
-                    time_slot_idx = next((i for i, ts in enumerate(self.time_slots) if ts[0] == time_slot[0]), -1)
-                    if time_slot_idx >= 0:
-                        # Check previous time slot
-                        if time_slot_idx > 0:
-                            prev_time_slot = self.time_slots[time_slot_idx - 1]
-                            if (existing_entry["day"] == day and
-                                existing_entry["startTime"] == prev_time_slot[0] and
-                                existing_entry["classId"] == class_id and
-                                existing_entry["subjectId"] == subject_id):
-                                valid_slot = False
-                                break
-
-                        # Check next time slot
-                        if time_slot_idx < len(self.time_slots) - 1:
-                            next_time_slot = self.time_slots[time_slot_idx + 1]
-                            if (existing_entry["day"] == day and
-                                existing_entry["startTime"] == next_time_slot[0] and
-                                existing_entry["classId"] == class_id and
-                                existing_entry["subjectId"] == subject_id):
-                                valid_slot = False
-                                break
-
-                if valid_slot:
-                    # Assign this slot
-                    room = np.random.choice(self.rooms) if self.rooms else {"id": f"room-{slot_idx}"}
-                    entry = {
-                        "id": str(uuid.uuid4()),
-                        "day": day,
-                        "startTime": time_slot[0],
-                        "endTime": time_slot[1],
-                        "classId": class_id,
-                        "subjectId": subject_id,
-                        "teacherId": teacher.get("id"),
-                        "roomId": room.get("id", f"room-{slot_idx}")
-                    }
-                    mock_schedule["entries"].append(entry)
-                    assigned_hours[(class_id, subject_id)] += 1
-                    hours_to_assign -= 1
+                # Check for back-to-back scheduling of the same subject
+                time_slot_idx = time_slot_index_by_start[start_time]
+                if (class_day_slot_subject.get((class_id, day, time_slot_idx - 1)) == subject_id or
+                        class_day_slot_subject.get((class_id, day, time_slot_idx + 1)) == subject_id):
+                    continue
+
+                # Assign this slot
+                room = random.choice(self.rooms) if self.rooms else {"id": f"room-{slot_idx}"}
+                entry = {
+                    "id": str(uuid.uuid4()),
+                    "day": day,
+                    "startTime": start_time,
+                    "endTime": time_slot[1],
+                    "classId": class_id,
+                    "subjectId": subject_id,
+                    "teacherId": teacher_id,
+                    "roomId": room.get("id", f"room-{slot_idx}")
+                }
+                mock_schedule["entries"].append(entry)
+                busy_teachers.add((day, start_time, teacher_id))
+                busy_classes.add((day, start_time, class_id))
+                class_day_subjects[(class_id, day)].add(subject_id)
+                class_day_slot_subject[(class_id, day, time_slot_idx)] = subject_id
+                assigned_hours[(class_id, subject_id)] += 1
+                hours_to_assign -= 1
 
             # Log if we couldn't assign all hours
             if hours_to_assign > 0:
@@ -1113,12 +1288,13 @@ class TimetableScheduler:
                               f"for subject {subject_id} in class {class_id}")
 
         # Log teacher assignments for verification
-        logger.info("Teacher assignments in mock schedule:")
-        for (class_id, subject_id), teacher in assigned_teachers.items():
-            hours = assigned_hours.get((class_id, subject_id), 0)
-            subject = next((s for s in self.subjects if s.get("id") == subject_id), {"hoursPerWeek": 0})
-            logger.info(f"  Class {class_id}, Subject {subject_id} -> Teacher {teacher.get('id')} "
-                       f"({hours}/{subject.get('hoursPerWeek', 0)} hours)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Teacher assignments in mock schedule:")
+            for (class_id, subject_id), teacher in assigned_teachers.items():
+                hours = assigned_hours.get((class_id, subject_id), 0)
+                subject = self.subject_by_id.get(subject_id, {"hoursPerWeek": 0})
+                logger.debug(f"  Class {class_id}, Subject {subject_id} -> Teacher {teacher.get('id')} "
+                            f"({hours}/{subject.get('hoursPerWeek', 0)} hours)")
 
         return mock_schedule
 
@@ -1146,17 +1322,63 @@ def generate_schedule(data: Dict[str, Any]) -> Dict[str, Any]:
         return {"scheduleId": f"error-schedule-{str(uuid.uuid4())[:8]}", "entries": []}
 
 
-def validate_constraints(data: Dict[str, Any]) -> Dict[str, Any]:
+class _StopValidation(Exception):
+    """Raised to end validate_constraints at the first issue when exhaustive is False."""
+
+
+def validate_constraints(data: Dict[str, Any], exhaustive: bool = True) -> Dict[str, Any]:
     """
     Validate scheduling constraints to check feasibility.
 
     Args:
         data (Dict[str, Any]): Contains all scheduling constraints.
+        exhaustive (bool): Report every issue (for the UI). When False, stop at the first issue,
+            which is enough for a feasibility gate before generate_schedule.
 
     Returns:
         Dict[str, Any]: Validation result with 'feasible' flag and list of 'issues'.
     """
+    payload: Dict[str, Any] = {key: data.get(key) for key in ('school_settings', 'teachers', 'classes', 'subjects', 'rooms')}
+    payload['exhaustive'] = exhaustive
+    cache_key: str = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    with _validation_cache_lock:
+        cached = _validation_cache.get(cache_key)
+        if cached is not None:
+            _validation_cache.move_to_end(cache_key)
+    if cached is not None:
+        feasible, cached_issues = cached
+        logger.info(f"Constraint validation served from cache. Feasible: {feasible}, Issues: {len(cached_issues)}")
+        return {"feasible": feasible, "issues": list(cached_issues)}
+
     issues: List[str] = []
+
+    def fail(message: str) -> None:
+        issues.append(message)
+        if not exhaustive:
+            raise _StopValidation()
+
+    try:
+        _check_constraints(data, fail)
+    except _StopValidation:
+        pass
+
+    feasible = len(issues) == 0
+    with _validation_cache_lock:
+        _validation_cache[cache_key] = (feasible, tuple(issues))
+        while len(_validation_cache) > VALIDATION_CACHE_SIZE:
+            _validation_cache.popitem(last=False)
+    logger.info(f"Constraint validation complete. Feasible: {feasible}, Issues: {len(issues)}")
+    return {"feasible": feasible, "issues": issues}
+
+
+def _check_constraints(data: Dict[str, Any], fail: Callable[[str], None]) -> None:
+    """
+    Run the validate_constraints checks, passing each issue found to fail.
+
+    Args:
+        data (Dict[str, Any]): Contains all scheduling constraints.
+        fail (Callable[[str], None]): Called with the message of each issue.
+    """
     school_settings: Dict[str, Any] = data.get('school_settings', {})
     teachers: List[Dict[str, Any]] = data.get('teachers', [])
     classes: List[Dict[str, Any]] = data.get('classes', [])
@@ -1164,88 +1386,155 @@ def validate_constraints(data: Dict[str, Any]) -> Dict[str, Any]:
     rooms: List[Dict[str, Any]] = data.get('rooms', [])
 
     if not school_settings:
-        issues.append("School settings are missing.")
+        fail("School settings are missing.")
     if not teachers:
-        issues.append("No teachers provided.")
+        fail("No teachers provided.")
     if not classes:
-        issues.append("No classes provided.")
+        fail("No classes provided.")
     if not subjects:
-        issues.append("No subjects provided.")
+        fail("No subjects provided.")
     if school_settings.get('useRoomConstraints', True) and not rooms:
-        issues.append("No rooms provided (required when room constraints are enabled).")
+        fail("No rooms provided (required when room constraints are enabled).")
 
     if school_settings:
         if not school_settings.get('startTime'):
-            issues.append("School start time is missing.")
+            fail("School start time is missing.")
         if not school_settings.get('endTime'):
-            issues.append("School end time is missing.")
+            fail("School end time is missing.")
         if not school_settings.get('lessonDuration'):
-            issues.append("Lesson duration is missing.")
+            fail("Lesson duration is missing.")
         max_subjects = school_settings.get('maxSubjectsPerDay')
         if max_subjects is not None and (not isinstance(max_subjects, int) or max_subjects < 0):
-            issues.append("Maximum subjects per day must be a positive integer.")
+            fail("Maximum subjects per day must be a positive integer.")
 
         free_periods = school_settings.get('freePeriods', [])
         for i, period in enumerate(free_periods):
-            if not period.get('name'):
-                issues.append(f"Free period at index {i} is missing a name.")
+            period_name = period.get('name')
+            if not period_name:
+                fail(f"Free period at index {i} is missing a name.")
+                period_name = f"at index {i}"
             if not period.get('startTime'):
-                issues.append(f"Free period '{period.get('name', f'at index {i}')}' is missing a start time.")
+                fail(f"Free period '{period_name}' is missing a start time.")
             if not period.get('days'):
-                issues.append(f"Free period '{period.get('name', f'at index {i}')}' has no assigned days.")
+                fail(f"Free period '{period_name}' has no assigned days.")
             if not period.get('forClasses'):
-                issues.append(f"Free period '{period.get('name', f'at index {i}')}' has no assigned classes.")
+                fail(f"Free period '{period_name}' has no assigned classes.")
 
-        try:
-            s_time = school_settings.get('startTime', '08:00')
-            e_time = school_settings.get('endTime', '15:00')
-            s_hours, s_minutes = map(int, s_time.split(':'))
-            e_hours, e_minutes = map(int, e_time.split(':'))
-            if e_hours * 60 + e_minutes <= s_hours * 60 + s_minutes:
-                issues.append("School end time must be after start time.")
-        except Exception:
-            issues.append("Invalid time format in school settings.")
+        s_time = school_settings.get('startTime', '08:00')
+        e_time = school_settings.get('endTime', '15:00')
+        s_match = HHMM_PATTERN.match(s_time) if isinstance(s_time, str) else None
+        e_match = HHMM_PATTERN.match(e_time) if isinstance(e_time, str) else None
+        if not (s_match and e_match):
+            fail("Invalid time format in school settings.")
+        elif (int(e_match.group(1)) * 60 + int(e_match.group(2))
+              <= int(s_match.group(1)) * 60 + int(s_match.group(2))):
+            fail("School end time must be after start time.")
 
+    subject_ids: Set[str] = {subject['id'] for subject in subjects if subject.get('id')}
+
+    # One pass per collection, with each record's display name resolved once
     for i, teacher in enumerate(teachers):
+        teacher_name: str = teacher.get('name') or f"at index {i}"
         if not teacher.get('id'):
-            issues.append(f"Teacher at index {i} is missing an ID.")
-        if not teacher.get('subjects'):
-            issues.append(f"Teacher '{teacher.get('name', f'at index {i}')}' has no assigned subjects.")
+            fail(f"Teacher at index {i} is missing an ID.")
+        teacher_subjects = teacher.get('subjects')
+        if not teacher_subjects:
+            fail(f"Teacher '{teacher_name}' has no assigned subjects.")
+            continue
+        for subj_id in teacher_subjects:
+            if subj_id not in subject_ids:
+                fail(f"Teacher '{teacher_name}' is assigned non-existent subject ID: {subj_id}")
 
     for i, cls in enumerate(classes):
+        class_name: str = cls.get('name') or f"at index {i}"
         if not cls.get('id'):
-            issues.append(f"Class at index {i} is missing an ID.")
-        if not cls.get('requiredSubjects'):
-            issues.append(f"Class '{cls.get('name', f'at index {i}')}' has no required subjects.")
+            fail(f"Class at index {i} is missing an ID.")
+        required_subjects = cls.get('requiredSubjects')
+        if not required_subjects:
+            fail(f"Class '{class_name}' has no required subjects.")
+            continue
+        for subj_id in required_subjects:
+            if subj_id not in subject_ids:
+                fail(f"Class '{class_name}' requires non-existent subject ID: {subj_id}")
 
-    subject_ids = set()
     for i, subject in enumerate(subjects):
         if not subject.get('id'):
-            issues.append(f"Subject at index {i} is missing an ID.")
-        else:
-            subject_ids.add(subject.get('id'))
+            fail(f"Subject at index {i} is missing an ID.")
         if not subject.get('hoursPerWeek'):
-            issues.append(f"Subject '{subject.get('name', f'at index {i}')}' has no specified hours per week.")
-
-    for i, cls in enumerate(classes):
-        for subj_id in cls.get('requiredSubjects', []):
-            if subj_id not in subject_ids:
-                issues.append(f"Class '{cls.get('name', f'at index {i}')}' requires non-existent subject ID: {subj_id}")
-    for i, teacher in enumerate(teachers):
-        for subj_id in teacher.get('subjects', []):
-            if subj_id not in subject_ids:
-                issues.append(f"Teacher '{teacher.get('name', f'at index {i}')}' is assigned non-existent subject ID: {subj_id}")
+            fail(f"Subject '{subject.get('name', f'at index {i}')}' has no specified hours per week.")
 
-    if len(rooms) < len(classes):
-        issues.append(f"Not enough rooms provided ({len(rooms)}) for the number of classes ({len(classes)}).")
+    # Weekly lessons each subject needs across all classes
+    hours_by_subject: Dict[str, Any] = {subject.get('id'): subject.get('hoursPerWeek') or 0 for subject in subjects}
+    lessons_by_subject: Dict[str, int] = defaultdict(int)
+    try:
+        for cls in classes:
+            for subj_id in cls.get('requiredSubjects') or []:
+                lessons_by_subject[subj_id] += int(hours_by_subject.get(subj_id, 0))
+    except (TypeError, ValueError):
+        lessons_by_subject.clear()
+
+    # Fewer rooms than classes only matters if the weekly lessons cannot fit into the rooms'
+    # time slots; classes meeting at different times can share a room
+    if school_settings.get('useRoomConstraints', True) and rooms and len(rooms) < len(classes):
+        weekly_slots: Optional[int] = _weekly_lesson_slots(school_settings)
+        weekly_lessons: int = sum(lessons_by_subject.values())
+        if weekly_slots is not None and weekly_lessons > len(rooms) * weekly_slots:
+            fail(f"Not enough rooms provided ({len(rooms)}) for {weekly_lessons} weekly lessons "
+                 f"in {weekly_slots} weekly time slots.")
+
+    # The qualified teachers' weekly limits must cover each subject's lessons
+    working_days: List[str] = school_settings.get('workingDays') or []
+    if working_days and lessons_by_subject:
+        capacity_by_subject: Dict[str, int] = defaultdict(int)
+        try:
+            for teacher in teachers:
+                weekly_capacity: int = min(int(teacher.get('maxHoursPerWeek', 20)),
+                                           int(teacher.get('maxHoursPerDay', 5)) * len(working_days))
+                for subj_id in dict.fromkeys(teacher.get('subjects') or []):
+                    capacity_by_subject[subj_id] += weekly_capacity
+        except (TypeError, ValueError):
+            capacity_by_subject.clear()
+        for subj_id, lessons in lessons_by_subject.items():
+            capacity: int = capacity_by_subject.get(subj_id, 0)
+            if 0 < capacity < lessons:
+                fail(f"Teachers of subject {subj_id} can cover at most {capacity} of its {lessons} weekly lessons.")
+
+
+def _weekly_lesson_slots(school_settings: Dict[str, Any]) -> Optional[int]:
+    """
+    Count the lesson time slots in a school week.
 
-    feasible: bool = len(issues) == 0
-    logger.info(f"Constraint validation complete. Feasible: {feasible}, Issues: {len(issues)}")
-    return {"feasible": feasible, "issues": issues}
+    Args:
+        school_settings (Dict[str, Any]): The school settings.
 
+    Returns:
+        Optional[int]: Lesson slots per day times working days, or None if the settings are incomplete.
+    """
+    try:
+        time_slots = generate_time_slots(
+            school_settings['startTime'],
+            school_settings['endTime'],
+            school_settings['lessonDuration'],
+            school_settings['breakDuration'],
+            school_settings['hasBreakfastBreak'],
+            school_settings['breakfastBreakStartTime'],
+            school_settings['breakfastBreakDuration'],
+            school_settings['lunchBreakStartTime'],
+            school_settings['lunchBreakDuration'],
+        )
+        return len(time_slots) * len(school_settings['workingDays'])
+    except Exception:
+        return None
+
+
+def _demo_payload() -> Dict[str, Any]:
+    """
+    Build a small sample input for running this module directly.
 
-if __name__ == "__main__":
-    sample_data = {
+    Returns:
+        Dict[str, Any]: School settings, teachers, classes, subjects and rooms.
+    """
+    return {
         "school_settings": {
             "startTime": "08:00",
             "endTime": "15:00",
@@ -1291,9 +1580,20 @@ if __name__ == "__main__":
             {"id": "room-2", "name": "Room 102"}
         ]
     }
-    validation = validate_constraints(sample_data)
+
+
+def _main() -> None:
+    """
+    Validate and schedule the demo payload, logging the result.
+    """
+    sample_data: Dict[str, Any] = _demo_payload()
+    validation = validate_constraints(sample_data, exhaustive=False)
     if validation["feasible"]:
         schedule = generate_schedule(sample_data)
-        logger.info(f"Generated Schedule: {schedule}")
+        logger.info("Generated Schedule: %s", schedule)
     else:
-        logger.error(f"Constraints are not feasible: {validation['issues']}")
\ No newline at end of file
+        logger.error("Constraints are not feasible: %s", validation['issues'])
+
+
+if __name__ == "__main__":
+    _main()
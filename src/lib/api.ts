@@ -38,6 +38,13 @@ export const schedulerApi = {
     });
   },
 
+  // Export one PDF per class as a ZIP archive
+  exportPdfBatch: (data: { schedule: Record<string, unknown>, classIds: string[], includeBreaks?: boolean }) => {
+    return api.post('/export/pdf/batch', data, {
+      responseType: 'blob',
+    });
+  },
+
   // Export schedule as Excel
   exportExcel: (data: { schedule: Record<string, unknown>, classId?: string, includeBreaks?: boolean }) => {
     return api.post('/export/excel', data, {
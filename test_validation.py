@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scheduler-backend'))
+
+from scheduler import _demo_payload, generate_schedule, validate_constraints
+
+
+def room_issues(data):
+    return [issue for issue in validate_constraints(data)['issues'] if issue.startswith("Not enough rooms")]
+
+
+def teacher_capacity_issues(data):
+    return [issue for issue in validate_constraints(data)['issues'] if "can cover at most" in issue]
+
+
+# The demo week has 20 lesson slots and its two classes need 21 lessons
+def test_fewer_rooms_than_classes_with_enough_room_slots():
+    data = _demo_payload()
+    data['rooms'] = data['rooms'][:1]
+    data['subjects'][2]['hoursPerWeek'] = 5
+    assert validate_constraints(data)['feasible']
+
+
+def test_too_few_room_slots():
+    data = _demo_payload()
+    data['rooms'] = data['rooms'][:1]
+    assert room_issues(data)
+
+
+# Without room constraints each class keeps its own room, so no rooms need to be listed
+def test_no_rooms_without_room_constraints():
+    data = _demo_payload()
+    data['school_settings'].update(useRoomConstraints=False, lessonsPerDay=4, daysPerWeek=5)
+    data['subjects'][2]['hoursPerWeek'] = 5
+    data['rooms'] = []
+    assert validate_constraints(data)['feasible']
+    schedule = generate_schedule(data)
+    assert schedule['scheduleId'].startswith("generated-schedule")
+    assert all(entry['roomId'] == entry['classId'] for entry in schedule['entries'] if not entry.get('isBreak'))
+
+
+# The two classes need 12 English lessons a week, all taught by Bob
+def test_teacher_capacity_below_demand():
+    data = _demo_payload()
+    data['teachers'][1]['maxHoursPerWeek'] = 10
+    assert teacher_capacity_issues(data) == ["Teachers of subject english can cover at most 10 of its 12 weekly lessons."]
+
+
+def test_teacher_capacity_counts_repeated_subject_once():
+    data = _demo_payload()
+    data['teachers'][1]['subjects'] = ["english", "english"]
+    data['teachers'][1]['maxHoursPerWeek'] = 10
+    assert teacher_capacity_issues(data) == ["Teachers of subject english can cover at most 10 of its 12 weekly lessons."]
+
+
+def test_subject_without_qualified_teachers():
+    data = _demo_payload()
+    data['teachers'] = data['teachers'][:1]
+    assert not teacher_capacity_issues(data)
+
+
+if __name__ == '__main__':
+    test_fewer_rooms_than_classes_with_enough_room_slots()
+    print("One room covers two classes when their lessons fit its time slots")
+    test_too_few_room_slots()
+    print("One room is flagged when the lessons exceed its time slots")
+    test_no_rooms_without_room_constraints()
+    print("A schedule without room constraints is generated when no rooms are listed")
+    test_teacher_capacity_below_demand()
+    print("Teachers whose weekly limits fall short of a subject's lessons are flagged")
+    test_teacher_capacity_counts_repeated_subject_once()
+    print("A teacher listing a subject twice is counted once towards its capacity")
+    test_subject_without_qualified_teachers()
+    print("A subject with no qualified teachers is not flagged as short of capacity")